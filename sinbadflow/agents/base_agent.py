@@ -9,20 +9,36 @@ class BaseAgent(Element, metaclass=ABCMeta):
         data: Object - payload of the object
         trigger: Trigger - trigger of the agent, Trigger.DEFAULT by default
         conditional_func: function object - conditional function (True/False), default_func by default
+        name: string - key under which run() return value is published to the result channel, str(data) by default
+        tags: list - agent tags used for sub-pipeline selection (see Selector), empty by default
+
+    Attributes:
+        results: ResultChannel - results of the upstream agents, set by Sinbadflow before the run (reads made in the
+            agent run thread return the results of that run, also if the agent is shared by submitted runs)
 
     Methods:
-        run() - abstractmethod \n
+        run() - abstractmethod, returned value is published to the result channel \n
         default_func()
     '''
 
+    __slots__ = ('conditional_func', 'name', 'tags', 'results')
+
     def default_func():
         '''Default conditional function'''
         return True
 
-    def __init__(self, data=None, trigger=Trigger.DEFAULT, conditional_func=default_func):
+    def __init__(self, data=None, trigger=Trigger.DEFAULT, conditional_func=default_func, name=None, tags=None):
         self.conditional_func = conditional_func
+        self.name = name
+        self.tags = frozenset(tags) if tags else frozenset()
+        self.results = None
         super(BaseAgent, self).__init__(data, trigger)
 
+    @property
+    def result_key(self):
+        '''Key under which run() return value is published to the result channel'''
+        return self.name if self.name is not None else str(self.data)
+
     ## This ensures that derived classes implements run method
     @abstractmethod
     def run(self):
@@ -1,7 +1,24 @@
-from ..utils import Trigger
+from ..utils import Trigger, set_run_details
 from .base_agent import BaseAgent
 from ..utils.dbr_job import *
 
+
+class FrozenDict(dict):
+    '''Read-only dict used for the shared defaults, unlike mappingproxy it can be pickled and deep copied'''
+
+    def __readonly(self, *args, **kwargs):
+        raise TypeError(f'{type(self).__name__} is read-only')
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = __readonly
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+# Shared read-only defaults, agents never copy or mutate them
+DEFAULT_ARGS = FrozenDict()
+DEFAULT_JOB_ARGS = FrozenDict()
+
 class DatabricksAgent(BaseAgent):
     '''Databricks notebook agent, used to run notebooks on interactive or job clusters
     
@@ -9,25 +26,49 @@ class DatabricksAgent(BaseAgent):
         notebook_path: string
         trigger: Trigger - trigger to run the agent, Trigger.DEFAULT by default
         timeout: int - timeout used for databricks jobs, 7200 by default
-        args: dict - arguments passed to databricks jobs, {} by default
+        args: dict - arguments passed to databricks jobs, empty by default
         cluster_mode: string - databricks cluster mode selection (interactive/job supported), 'interactive' by default
-        job_args: dict - job cluster parameters. Values that can be changed: 'spark_version', 'node_type_id','driver_node_type_id', 'num_workers'. For more information see - https://docs.databricks.com/dev-tools/api/latest/jobs.html
+        job_args: dict - job cluster parameters. Values that can be changed: 'spark_version', 'node_type_id','driver_node_type_id', 'num_workers', 'instance_pool_id'.
+            Use 'existing_cluster_id' to run the job on an existing cluster. For more information see - https://docs.databricks.com/dev-tools/api/latest/jobs.html
+        cluster_id: string - interactive cluster to run the notebook on through the Jobs API (sets 'existing_cluster_id' of job_args),
+            the notebook is run with dbutils on the current cluster if None, None by default
+        workspace: Workspace - workspace of the job runs, JobSubmitter workspace pool or default instance is used if None, None by default
+        watchdog: RunWatchdog - stall detection of the job runs, JobSubmitter watchdog is used if None, None by default
 
     Methods:
-        run()
+        run() -> string - runs the notebook, returns the notebook exit value (Databricks run_id and queue_seconds
+            of the run are recorded with set_run_details)
     '''
 
+    __slots__ = ('timeout', 'args', 'cluster_mode', 'job_args', 'workspace', 'watchdog')
+
     def __init__(self, notebook_path=None, trigger = Trigger.DEFAULT, timeout=7200,
-                args={}, cluster_mode='interactive', job_args={}, **kwargs):
-        self.notebook_path = notebook_path
-        self.trigger = trigger
+                args=DEFAULT_ARGS, cluster_mode='interactive', job_args=DEFAULT_JOB_ARGS, cluster_id=None, workspace=None, watchdog=None, **kwargs):
         self.timeout = timeout
         self.args = args
         self.cluster_mode = cluster_mode
-        self.job_args = job_args
+        self.job_args = job_args if cluster_id is None else dict(job_args, existing_cluster_id=cluster_id)
+        self.workspace = workspace
+        self.watchdog = watchdog
         super(DatabricksAgent, self).__init__(notebook_path, trigger, **kwargs)
 
+    @property
+    def notebook_path(self):
+        '''Notebook location in the workspace (agent data)'''
+        return self.data
+
+    @notebook_path.setter
+    def notebook_path(self, notebook_path):
+        self.data = notebook_path
+
     def run(self):
-        '''Runs the notebook on interactive or job cluster'''
-        js = JobSubmitter(self.cluster_mode, self.job_args)
-        js.submit_notebook(self.notebook_path, self.timeout, self.args)
+        '''Runs the notebook on interactive or job cluster
+
+        Returns:
+            string - notebook exit value, published to the result channel
+        '''
+        js = JobSubmitter(self.cluster_mode, self.job_args, self.workspace, self.watchdog)
+        try:
+            return js.submit_notebook(self.notebook_path, self.timeout, self.args)
+        finally:
+            set_run_details(self, queue_seconds=js.queue_seconds, run_id=js.run_id)
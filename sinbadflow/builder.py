@@ -0,0 +1,126 @@
+'''Linear-time construction of long pipelines'''
+from .element import Element
+
+
+class PipelineBuilder():
+    '''PipelineBuilder constructs the pipeline in one pass. Steps are linked directly without ">>" wrapping and head
+    lookup, the builder keeps both ends of the pipeline so appending and concatenation take constant time.
+    Chaining ">>" with single agents is linear too, but every ">>" with an existing pipeline on the right walks it to
+    its head, so joining many pipelines that way is quadratic.
+
+    Args:
+        steps: iterable - agents (single step) and lists of agents (parallel step), None by default
+
+    Methods:
+        add(step: BaseAgent or list) -> PipelineBuilder - appends the step \n
+        extend(steps: iterable) -> PipelineBuilder - appends the steps \n
+        concat(other: PipelineBuilder) -> PipelineBuilder - appends all steps of the other builder in O(1) \n
+        from_pipeline(pipeline: BaseAgent) -> PipelineBuilder (class method) - returns builder continuing the pipeline \n
+        build() -> BaseAgent - returns the pipeline (tail element) ready for Sinbadflow run
+
+    Usage example:
+
+        pipeline = PipelineBuilder(DatabricksAgent(f'/load/{table}') for table in tables).build()
+
+        builder = PipelineBuilder([ingest, [clean_x, clean_y]])
+        builder.concat(PipelineBuilder(reports)).add(notify)
+        sf.run(builder.build())
+    '''
+
+    __slots__ = ('head', 'tail', 'length')
+
+    def __init__(self, steps=None):
+        self.head = None
+        self.tail = None
+        self.length = 0
+        if steps is not None:
+            self.extend(steps)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        '''Returns builder continuing the existing pipeline, the pipeline is walked once
+
+        Args:
+            pipeline: BaseAgent object
+
+        Returns:
+            PipelineBuilder
+        '''
+        return cls().add(pipeline)
+
+    def add(self, step):
+        '''Appends the step to the pipeline
+
+        Args:
+            step: BaseAgent (single step), list (parallel step) or existing pipeline
+
+        Returns:
+            PipelineBuilder
+        '''
+        if type(step) == list:
+            self.__link(Element(step))
+        elif type(step.data) != list:
+            self.__link(Element([step]))
+        else:
+            # Existing pipeline (or wrapped step) is spliced with all its steps
+            head, length = step, 1
+            while head.prev_elem is not None:
+                head = head.prev_elem
+                length += 1
+            while step.next_elem is not None:
+                step = step.next_elem
+                length += 1
+            self.__splice(head, step, length)
+        return self
+
+    def extend(self, steps):
+        '''Appends the steps to the pipeline
+
+        Args:
+            steps: iterable - agents and lists of agents
+
+        Returns:
+            PipelineBuilder
+        '''
+        for step in steps:
+            self.add(step)
+        return self
+
+    def concat(self, other):
+        '''Appends all steps of the other builder in constant time, the other builder is emptied
+
+        Args:
+            other: PipelineBuilder
+
+        Returns:
+            PipelineBuilder
+        '''
+        if other is self:
+            raise ValueError('Pipeline can not be concatenated with itself')
+        if other.head is not None:
+            self.__splice(other.head, other.tail, other.length)
+            other.head, other.tail, other.length = None, None, 0
+        return self
+
+    def build(self):
+        '''Returns the pipeline
+
+        Returns:
+            BaseAgent (tail element) or None if no steps were added
+        '''
+        return self.tail
+
+    def __len__(self):
+        return self.length
+
+    def __link(self, elem):
+        self.__splice(elem, elem, 1)
+
+    def __splice(self, head, tail, length):
+        if self.tail is None:
+            self.head = head
+        else:
+            self.tail.next_elem = head
+            head.prev_elem = self.tail
+        self.tail = tail
+        self.length += length
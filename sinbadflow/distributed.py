@@ -0,0 +1,268 @@
+'''Distributed execution of Sinbadflow agents on remote worker processes'''
+from .utils import Logger, LogLevel, get_run_details, set_run_details
+from multiprocessing.connection import Client, Listener
+import argparse
+import copy
+import io
+import sys
+import threading
+
+
+class WorkerLostError(Exception):
+    '''Custom exception class used in Coordinator class'''
+    pass
+
+
+class RemoteAgentError(Exception):
+    '''Custom exception class used in Coordinator class'''
+    pass
+
+
+# Message sent by the worker while the agent is running, the coordinator treats a silent worker as lost
+HEARTBEAT = 'HEARTBEAT'
+
+# Attributes which bind the agent to the local pipeline and are never sent to the workers
+LOCAL_ATTRIBUTES = ('next_elem', 'prev_elem', 'conditional_func', 'results')
+
+
+def get_agent_state(agent):
+    '''Returns agent attributes (slots and __dict__) without local pipeline attributes
+
+    Args:
+        agent: BaseAgent
+
+    Returns:
+        dict
+    '''
+    state = dict(getattr(agent, '__dict__', {}))
+    for cls in type(agent).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(agent, name):
+                state[name] = getattr(agent, name)
+    for name in LOCAL_ATTRIBUTES:
+        state.pop(name, None)
+    return state
+
+
+class ThreadOutput(io.TextIOBase):
+    '''stdout replacement which captures the output of the threads running remote agents'''
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return buffer.write(text) if buffer is not None else self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class Worker():
+    '''Worker process which runs agents sent by the Coordinator. Every connection is served in its own thread,
+    agent stdout is captured and sent back together with the run status and the returned value. While the agent
+    is running a heartbeat is sent every heartbeat_seconds. Agent classes must be importable on the worker host.
+    Connections are authenticated with authkey, there is no default key - agents are transferred with pickle, so
+    anyone knowing the key can run code on the worker. Workers listen on the loopback interface by default, bind
+    to other interfaces in trusted networks only.
+
+    Args:
+        authkey: bytes - shared secret of the coordinator and the workers
+        address: tuple - (host, port) to listen on, ('127.0.0.1', 6000) by default
+        heartbeat_seconds: float - interval of the heartbeats sent while the agent is running, 5 by default
+
+    Methods:
+        serve_forever() - accepts and runs agents until shutdown() \n
+        start() - serves in the background thread \n
+        shutdown() - stops accepting new agents
+
+    Usage example (on the worker host):
+
+        python -m sinbadflow.distributed --host 10.0.0.1 --port 6000 --authkey secret
+    '''
+
+    def __init__(self, authkey, address=('127.0.0.1', 6000), heartbeat_seconds=5):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.__running = True
+
+    def serve_forever(self):
+        '''Accepts and runs agents until shutdown()'''
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        while self.__running:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                if not self.__running:
+                    return
+                continue
+            threading.Thread(target=self.__serve_connection, args=(conn,), daemon=True).start()
+
+    def start(self):
+        '''Serves in the background thread
+
+        Returns:
+            Worker
+        '''
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        '''Stops accepting new agents'''
+        self.__running = False
+        self.listener.close()
+
+    def __serve_connection(self, conn):
+        with conn:
+            try:
+                agent = conn.recv()
+            except (OSError, EOFError):
+                return
+            result = []
+            runner = threading.Thread(target=lambda: result.append(self.__run_agent(agent)), daemon=True)
+            runner.start()
+            runner.join(self.heartbeat_seconds)
+            try:
+                while runner.is_alive():
+                    conn.send(HEARTBEAT)
+                    runner.join(self.heartbeat_seconds)
+            except (OSError, EOFError):
+                # Coordinator is gone, the agent result is dropped
+                return
+            status, payload, output, state, details = result[0]
+            try:
+                conn.send((status, payload, output, state, details))
+            except Exception as e:
+                conn.send(('FAIL', f'Agent result can not be sent to the coordinator: {e}', output, {}, {}))
+
+    def __run_agent(self, agent):
+        output = sys.stdout
+        buffer = io.StringIO()
+        if isinstance(output, ThreadOutput):
+            output.local.buffer = buffer
+        try:
+            value = agent.run()
+            status, payload = 'OK', value
+        except Exception as e:
+            status, payload = 'FAIL', f'{type(e).__name__}: {e}'
+        finally:
+            if isinstance(output, ThreadOutput):
+                output.local.buffer = None
+        return status, payload, buffer.getvalue(), get_agent_state(agent), get_run_details(agent)
+
+
+class Coordinator():
+    '''Coordinator dispatches agents to the remote workers. Agents are sent to the least loaded worker,
+    if the worker is lost (connection error or no heartbeat within heartbeat_timeout) the agent is redispatched to
+    another one (the agent might run again from the start). Agents are sent without pipeline links, conditional
+    function and result channel.
+
+    Args:
+        workers: list - worker addresses [(host, port), ...]
+        authkey: bytes - shared secret of the coordinator and the workers
+        slots_per_worker: int - number of agents run by one worker at the same time, 1 by default
+        logging_option: object - selects preferred option of logging of the agents output (print/logging supported), print by default
+        heartbeat_timeout: float - seconds without any message after which the worker is lost, 30 by default
+            (must be longer than the worker heartbeat_seconds)
+
+    Methods:
+        run(agent: BaseAgent) -> object - runs the agent on the remote worker, returns agent run() value
+
+    Usage example:
+
+        coordinator = Coordinator([('10.0.0.1', 6000), ('10.0.0.2', 6000)], authkey=b'secret', slots_per_worker=4)
+        sf = Sinbadflow(dispatcher=coordinator)
+        sf.run(pipeline)
+    '''
+
+    def __init__(self, workers, authkey, slots_per_worker=1, logging_option=print, heartbeat_timeout=30):
+        self.authkey = authkey
+        self.slots_per_worker = slots_per_worker
+        self.heartbeat_timeout = heartbeat_timeout
+        self.logger = Logger(logging_option)
+        self.__load = {tuple(address): 0 for address in workers}
+        self.__condition = threading.Condition()
+
+    def run(self, agent):
+        '''Runs the agent on the remote worker, returned agent state is copied to the local agent
+
+        Args:
+            agent: BaseAgent
+
+        Returns:
+            object - value returned by agent run()
+        '''
+        remote_agent = self.__detach(agent)
+        while True:
+            address = self.__acquire_worker()
+            try:
+                with Client(address, authkey=self.authkey) as conn:
+                    conn.send(remote_agent)
+                    status, payload, output, state, details = self.__receive(conn)
+            except (OSError, EOFError) as e:
+                self.__remove_worker(address, e)
+                continue
+            finally:
+                self.__release_worker(address)
+            break
+        if output:
+            self.logger.log(output.rstrip('\n'), LogLevel.INFO)
+        for name, value in state.items():
+            setattr(agent, name, value)
+        set_run_details(agent, **details)
+        if status == 'FAIL':
+            raise RemoteAgentError(f'Agent {agent.data} failed on worker {address}: {payload}')
+        return payload
+
+    def __receive(self, conn):
+        while True:
+            if not conn.poll(self.heartbeat_timeout):
+                raise TimeoutError(f'no heartbeat for {self.heartbeat_timeout} seconds')
+            message = conn.recv()
+            if message != HEARTBEAT:
+                return message
+
+    def __detach(self, agent):
+        remote_agent = copy.copy(agent)
+        for name in LOCAL_ATTRIBUTES:
+            if hasattr(remote_agent, name):
+                setattr(remote_agent, name, None)
+        return remote_agent
+
+    def __acquire_worker(self):
+        with self.__condition:
+            while True:
+                if not self.__load:
+                    raise WorkerLostError('All workers are lost')
+                address = min(self.__load, key=self.__load.get)
+                if self.__load[address] < self.slots_per_worker:
+                    self.__load[address] += 1
+                    return address
+                self.__condition.wait()
+
+    def __release_worker(self, address):
+        with self.__condition:
+            if address in self.__load:
+                self.__load[address] -= 1
+            self.__condition.notify()
+
+    def __remove_worker(self, address, error):
+        self.logger.log(f'Worker {address} lost ({error}), redispatching the agent', LogLevel.WARNING)
+        with self.__condition:
+            self.__load.pop(address, None)
+            self.__condition.notify_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sinbadflow remote worker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6000)
+    parser.add_argument('--authkey', required=True)
+    parser.add_argument('--heartbeat-seconds', type=float, default=5)
+    args = parser.parse_args()
+    worker = Worker(args.authkey.encode('utf-8'), (args.host, args.port), args.heartbeat_seconds)
+    print(f'Sinbadflow worker listening on {worker.address}')
+    worker.serve_forever()
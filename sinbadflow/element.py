@@ -28,6 +28,8 @@ class Element():
             pipeline_x >> pipeline_y
     '''
 
+    __slots__ = ('data', 'trigger', 'next_elem', 'prev_elem')
+
     def __init__(self, data, trigger=Trigger.DEFAULT):
         self.data = data
         self.trigger = trigger
@@ -1,8 +1,16 @@
 '''Main execution part of Sinbadflow library'''
 from .utils import Logger, LogLevel
 from .utils import StatusHandler, Status
+from .utils import ConditionCache, CacheScope
+from .utils import ResultChannel, run_with_results, set_run_details
 from concurrent.futures import ThreadPoolExecutor, wait
+import copy
+import queue
+import threading
+import time
 from .element import Element
+from .plugins import BasePlugin, EventStream
+from .run_handle import RunHandle
 
 class Sinbadflow():
     '''Sinbadflow pipeline runner. Named after famous cartoon "Sinbad: Legend of the Seven Seas" it provides ability to run pipelines made of agents
@@ -12,9 +20,29 @@ class Sinbadflow():
         logging_option: object - selects preferred option of logging (print/logging supported), print by default
         status_handler: StatusHandler - object used for status to trigger comparison and result retrieval, None by default
         log_errors: boolean - flag to set explicit error logging with preferred logging_option, False by default
+        prewarmer: ClusterPrewarmer - object used to start/reserve compute for the next step while current step runs, None by default
+        condition_cache: ConditionCache - object used for (cached) conditional function evaluation, ConditionCache() by default
+        prefetch_conditions: boolean - flag to evaluate CacheScope.RUN conditional functions of the next step while current step runs, False by default
+        metrics: MetricsCollector - object used to collect run metrics (Prometheus text format), None by default
+        plugins: list - plugins (BasePlugin objects) with lifecycle hooks, None by default
+        dispatcher: Coordinator - object used to run the agents on remote workers, None (local run) by default
+        result_channel: ResultChannel - object used to pass agent run() return values downstream, ResultChannel() by default
+        release_finished_steps: boolean - flag to unlink finished steps from the pipeline during the run to keep memory bounded
+            (the pipeline can't be reused after the run), False by default
+        max_background_runs: int - number of submitted pipelines running at the same time, ThreadPoolExecutor default by default
+        validator: PipelineValidator - object used to check the pipeline before the run (PipelineValidationError is raised), None by default
+
+    Attributes:
+        results: ResultChannel - agent results of the current (last) run, readable by agents and conditional functions
 
     Methods:
-        run(pipeline: BaseAgent) - runs the input pipeline \n
+        run(pipeline: BaseAgent, selector: Selector) - runs the input pipeline (or its selected slice) \n
+        submit(pipeline: BaseAgent, selector: Selector) -> RunHandle - runs the pipeline in the background, returns immediately \n
+        cancel() - stops the current run after the running step \n
+        iter_events(pipeline: BaseAgent, selector: Selector) -> generator - runs the pipeline in background thread and yields RunEvent objects \n
+        register_plugin(plugin: BasePlugin) - registers lifecycle hooks overridden by the plugin \n
+        unregister_plugin(plugin: BasePlugin) - removes lifecycle hooks of the plugin \n
+        add_hook(name: string, func: function) - adds function to the lifecycle hook (see BasePlugin.HOOKS) \n
         get_head_from_pipeline(pipeline: BaseAgent) -> BaseAgent - returns the head element form the pipeline \n
         print_pipeline(pipeline: BaseAgent) - logs the full pipeline
 
@@ -28,38 +56,197 @@ class Sinbadflow():
         sf.run(pipeline)
     '''
 
-    def __init__(self, logging_option=print, status_handler=None, log_errors=False):
+    def __init__(self, logging_option=print, status_handler=None, log_errors=False, prewarmer=None,
+                 condition_cache=None, prefetch_conditions=False, metrics=None, plugins=None,
+                 dispatcher=None, result_channel=None, release_finished_steps=False, max_background_runs=None,
+                 validator=None):
         if status_handler:
             self.status_handler = status_handler
         else:
             self.status_handler = StatusHandler()
         self.logger = Logger(logging_option)
         self.log_errors = log_errors
+        self.prewarmer = prewarmer
+        self.condition_cache = condition_cache if condition_cache else ConditionCache()
+        self.prefetch_conditions = prefetch_conditions
+        self.metrics = metrics
+        self.dispatcher = dispatcher
+        self.results = result_channel if result_channel else ResultChannel()
+        self.release_finished_steps = release_finished_steps
+        self.validator = validator
         self.head = None
+        self.__hooks = {name: () for name in BasePlugin.HOOKS}
+        self.__cancel_event = threading.Event()
+        self.__background_runs = ThreadPoolExecutor(max_workers=max_background_runs, thread_name_prefix='sinbadflow')
+        for plugin in plugins or []:
+            self.register_plugin(plugin)
+
+    def register_plugin(self, plugin):
+        '''Registers lifecycle hooks overridden by the plugin
+
+        Args:
+            plugin: BasePlugin object
+        '''
+        for name in BasePlugin.HOOKS:
+            method = getattr(type(plugin), name, None)
+            if method is not None and method is not getattr(BasePlugin, name):
+                self.add_hook(name, getattr(plugin, name))
+
+    def unregister_plugin(self, plugin):
+        '''Removes lifecycle hooks of the plugin
+
+        Args:
+            plugin: BasePlugin object
+        '''
+        for name in BasePlugin.HOOKS:
+            method = getattr(plugin, name, None)
+            self.__hooks[name] = tuple(func for func in self.__hooks[name] if func != method)
+
+    def add_hook(self, name, func):
+        '''Adds function to the lifecycle hook
+
+        Args:
+            name: string - hook name (before_pipeline, before_step, before_run, after_run, on_skip, after_step, after_pipeline)
+            func: function object - called with the hook arguments (see BasePlugin), raised errors are logged and don't stop the run
+        '''
+        if name not in self.__hooks:
+            raise ValueError(f'Unknown hook "{name}", supported hooks: {BasePlugin.HOOKS}')
+        self.__hooks[name] = self.__hooks[name] + (func,)
 
-    def run(self, pipeline):
+    def __call_hooks(self, name, *args):
+        # Plugins must not stop the pipeline, hook errors are only logged
+        for func in self.__hooks[name]:
+            try:
+                func(*args)
+            except Exception as e:
+                self.logger.log(f'Hook {name} {getattr(func, "__qualname__", func)} failed: {type(e).__name__}: {e}',
+                                LogLevel.WARNING)
+
+    def run(self, pipeline, selector=None):
         '''Runs the input pipeline
 
         Args:
             pipeline: BaseAgent object
+            selector: Selector - object used to run only the selected slice of the pipeline, None by default
 
         Example usage:
             pipeline = element1 >> element2
             sinbadflow_instance.run(pipeline)
         '''
-        pipeline = self.__wrap_element_if_single(pipeline)
+        if selector:
+            # Selected slice is already made of wrapped steps
+            pipeline = selector.select(pipeline)
+            if pipeline is None:
+                self.logger.log('No agents selected, nothing to run', LogLevel.WARNING)
+                return
+        else:
+            pipeline = self.__wrap_element_if_single(pipeline)
+        if self.validator:
+            self.validator.check(pipeline)
         self.head = self.get_head_from_pipeline(pipeline)
+        self.condition_cache.invalidate(CacheScope.RUN)
+        self.results.clear()
         self.logger.log('Pipeline run started')
-        self.__traverse_pipeline(self.__run_elements)
+        if self.metrics:
+            self.metrics.pipeline_started()
+        if self.__hooks['before_pipeline']:
+            self.__call_hooks('before_pipeline', pipeline)
+        try:
+            run_with_results(self.results, self.__run_pipeline)
+        finally:
+            self.__cancel_event.clear()
+            if self.metrics:
+                self.metrics.pipeline_finished()
+            if self.__hooks['after_pipeline']:
+                self.__call_hooks('after_pipeline', self.status_handler)
         self.logger.log(f'\nPipeline run finished')
         self.status_handler.print_results(self.logger)
 
+    def submit(self, pipeline, selector=None):
+        '''Runs the input pipeline in the background and returns immediately. Every submission runs on a copy of the
+        runner with its own StatusHandler, ConditionCache and ResultChannel forked from the runner results (conditional
+        functions reading sinbadflow_instance.results see the results of their own run). Every plugin is replaced with
+        its for_run() object, plugins which can't serve concurrent runs raise RuntimeError. Metrics are shared.
+
+        Args:
+            pipeline: BaseAgent object
+            selector: Selector - object used to run only the selected slice of the pipeline, None by default
+
+        Returns:
+            RunHandle
+
+        Example usage:
+            handle = sinbadflow_instance.submit(pipeline)
+            handle.wait(timeout=600)
+        '''
+        runner = copy.copy(self)
+        runner.status_handler = type(self.status_handler)()
+        runner.results = self.results.fork()
+        runner.condition_cache = ConditionCache(self.condition_cache.default_scope, self.condition_cache.max_workers)
+        runner.head = None
+        plugins = {}
+        runner.__hooks = {name: tuple(self.__get_run_hook(name, func, plugins) for func in funcs)
+                          for name, funcs in self.__hooks.items()}
+        runner.__cancel_event = threading.Event()
+        return RunHandle(runner, pipeline, selector, self.__background_runs)
+
+    def __get_run_hook(self, name, func, plugins):
+        # Hooks of the same plugin are bound to one run copy of the plugin
+        plugin = getattr(func, '__self__', None)
+        if not isinstance(plugin, BasePlugin):
+            return func
+        if id(plugin) not in plugins:
+            plugins[id(plugin)] = plugin.for_run()
+        return getattr(plugins[id(plugin)], name)
+
+    def cancel(self):
+        '''Stops the current run, running agents are finished and the following steps are not started'''
+        self.__cancel_event.set()
+
+    def iter_events(self, pipeline, selector=None):
+        '''Runs the pipeline in the background thread and yields run events as they happen
+
+        Args:
+            pipeline: BaseAgent object
+            selector: Selector - object used to run only the selected slice of the pipeline, None by default
+
+        Returns:
+            generator (of RunEvent), exception of the run is raised after the last event
+
+        Example usage:
+            for event in sinbadflow_instance.iter_events(pipeline):
+                if event.type == EventType.AGENT_FINISHED:
+                    print(event.agent.data, event.status, event.duration)
+        '''
+        events = queue.Queue()
+        stream = EventStream(events.put)
+        errors = []
+        self.register_plugin(stream)
+
+        def run_pipeline():
+            try:
+                self.run(pipeline, selector)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                self.unregister_plugin(stream)
+                events.put(None)
+
+        threading.Thread(target=run_pipeline, daemon=True).start()
+        event = events.get()
+        while event is not None:
+            yield event
+            event = events.get()
+        if errors:
+            raise errors[0]
+
     def __wrap_element_if_single(self, pipeline):
         if type(pipeline) == list:
             return Element(pipeline)
-        elif pipeline.prev_elem == None and pipeline.next_elem == None:
+        elif type(pipeline.data) != list:
+            # Single agent, pipeline steps (also an unlinked one, e.g. PipelineBuilder with one step) hold lists
             return Element([pipeline])
-        return pipeline    
+        return pipeline
 
     def get_head_from_pipeline(self, pipeline):
         '''Returns head element from the pipeline
@@ -79,13 +266,53 @@ class Sinbadflow():
             func(pointer)
             pointer = pointer.next_elem if forward else pointer.prev_elem
 
+    def __run_pipeline(self):
+        pointer = self.head
+        next_elements = []
+        try:
+            while pointer is not None:
+                if self.__cancel_event.is_set():
+                    self.logger.log('Pipeline run cancelled, remaining steps are not started', LogLevel.WARNING)
+                    return
+                next_elements = self.__get_next_elements(pointer) if self.prewarmer or self.prefetch_conditions else []
+                self.__run_elements(pointer, next_elements)
+                pointer = self.__release_step(pointer) if self.release_finished_steps else pointer.next_elem
+        finally:
+            if self.prewarmer:
+                # Step pre-warmed by the last run step never starts if the run was cancelled or failed
+                self.prewarmer.release(next_elements, skipped=True)
+
+    def __release_step(self, elem):
+        next_elem = elem.next_elem
+        elem.next_elem = None
+        if next_elem is not None:
+            next_elem.prev_elem = None
+        self.head = next_elem
+        return next_elem
+
     def __set_head_element(self, elem):
         if elem.prev_elem == None:
             self.head = elem
 
-    def __run_elements(self, elem):
+    def __run_elements(self, elem, next_elements):
         triggered_elements = self.__get_non_empty_elements_to_execute(elem)
-        self.__execute_elements(triggered_elements)
+        if self.prefetch_conditions:
+            self.condition_cache.prefetch([el.conditional_func for el in next_elements])
+        if self.prewarmer:
+            self.prewarmer.prewarm(next_elements)
+            self.prewarmer.dispatch(triggered_elements)
+        try:
+            self.__execute_elements(triggered_elements)
+        finally:
+            if self.prewarmer:
+                self.prewarmer.release(triggered_elements)
+        if self.prewarmer:
+            self.prewarmer.release([el for el in next_elements if not self.__is_trigger_initiated(el.trigger)], skipped=True)
+
+    def __get_next_elements(self, elem):
+        if elem.next_elem is None:
+            return []
+        return self.__get_non_empty_elements_to_execute(elem.next_elem)
 
     def __get_non_empty_elements_to_execute(self, element):
         return [elem for elem in element.data if elem.data != None]
@@ -96,23 +323,74 @@ class Sinbadflow():
         self.logger.log('\n-----------PIPELINE STEP-----------')
         self.logger.log(
             f'   Executing pipeline element(s): {[elem.data for elem in element_list]}')
-        result_statuses = []
-        with ThreadPoolExecutor(max_workers=None) as executor:
-            for status in executor.map(self.__execute, element_list):
-                result_statuses.append(status)
-        self.status_handler.add_status(result_statuses)
+        if self.__hooks['before_step']:
+            self.__call_hooks('before_step', element_list)
+        self.status_handler.open_step(len(element_list))
+        positions_to_run = self.__get_positions_to_run(element_list)
+        if positions_to_run:
+            elements_to_run = [element_list[i] for i in positions_to_run]
+            with ThreadPoolExecutor(max_workers=None) as executor:
+                workers = min(len(elements_to_run), executor._max_workers)
+                if self.metrics:
+                    self.metrics.step_started(workers)
+                # Statuses are recorded by the agents as they finish, agent errors are recorded as FAIL and
+                # result() re-raises only unexpected errors of the runner (e.g. custom StatusHandler or metrics)
+                try:
+                    futures = [executor.submit(run_with_results, self.results, self.__execute_and_record, elem, i) for elem, i in zip(elements_to_run, positions_to_run)]
+                    for future in futures:
+                        future.result()
+                finally:
+                    # Workers are reported free once all running agents are finished
+                    executor.shutdown(wait=True)
+                    if self.metrics:
+                        self.metrics.step_finished(workers)
+        result_statuses = self.status_handler.close_step()
+        if self.__hooks['after_step']:
+            self.__call_hooks('after_step', element_list, result_statuses)
+
+    def __get_positions_to_run(self, element_list):
+        # Skipped elements are resolved before the dispatch, so they never take a worker
+        self.condition_cache.invalidate(CacheScope.STEP)
+        triggered = [i for i, elem in enumerate(element_list) if self.__is_trigger_initiated(elem.trigger)]
+        conditions = self.condition_cache.evaluate_all([element_list[i].conditional_func for i in triggered])
+        passed = {i for i, condition in zip(triggered, conditions) if condition}
+        for i, elem in enumerate(element_list):
+            if i in passed:
+                continue
+            self.__log_and_return_result(Status.SKIPPED, elem)
+            self.status_handler.record(i, Status.SKIPPED)
+            if self.metrics:
+                self.metrics.agent_skipped(elem)
+            if self.__hooks['on_skip']:
+                self.__call_hooks('on_skip', elem)
+        return sorted(passed)
+
+    def __execute_and_record(self, element, position):
+        self.status_handler.record(position, self.__execute(element))
 
     def __execute(self, element):
-        if not self.__is_trigger_initiated(element.trigger) or not element.conditional_func():
-            result_status = Status.SKIPPED
-        else:
-            try:
-                element.run()
-                result_status = Status.OK
-            except Exception as e:
-                if self.log_errors:
-                    self.logger.log(e, LogLevel.CRITICAL)
-                result_status = Status.FAIL
+        if self.metrics:
+            self.metrics.agent_started(element)
+        if self.__hooks['before_run']:
+            self.__call_hooks('before_run', element)
+        start_time = time.time()
+        # Agents can be shared by submitted runs, the root channel resolves reads to the run of the agent thread
+        element.results = self.results if self.results.parent is None else self.results.parent
+        set_run_details(element)
+        try:
+            value = self.dispatcher.run(element) if self.dispatcher else element.run()
+            if value is not None:
+                self.results.publish(element.result_key, value)
+            result_status = Status.OK
+        except Exception as e:
+            if self.log_errors:
+                self.logger.log(e, LogLevel.CRITICAL)
+            result_status = Status.FAIL
+        duration = time.time() - start_time
+        if self.metrics:
+            self.metrics.agent_finished(element, result_status, duration)
+        if self.__hooks['after_run']:
+            self.__call_hooks('after_run', element, result_status, duration)
         return self.__log_and_return_result(result_status, element)
 
     def __log_and_return_result(self, status, element):
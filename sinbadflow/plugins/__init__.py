@@ -0,0 +1,8 @@
+'''Plugins extend the Sinbadflow run with lifecycle hooks (before_step, before_run, after_run, on_skip, after_step).
+The package provides the base class for own plugins, profiling plugins for the agents, run event stream,
+SQLite run history and job cluster autosizer.'''
+from .base_plugin import BasePlugin
+from .profiling import CProfilePlugin, TracemallocPlugin
+from .events import EventStream, EventType, RunEvent
+from .history import RunHistory
+from .autosizer import ClusterAutosizer
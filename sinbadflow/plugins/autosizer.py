@@ -0,0 +1,80 @@
+from .base_plugin import BasePlugin
+import math
+
+
+class ClusterAutosizer(BasePlugin):
+    '''Plugin which sets job cluster size of every job mode agent before its run. The work of the agent (run duration
+    multiplied by the number of workers) is estimated from the recent successful runs recorded by RunHistory and
+    divided by the target runtime. Every run is recorded with the chosen size, so the estimate keeps tuning itself.
+    Agents without history or running on existing clusters keep their job_args.
+
+    Args:
+        history: RunHistory - recorded agent runs (the same object should be registered as a plugin)
+        target_seconds: float - desired agent run duration
+        min_workers: int - lower limit of the workers, 1 by default
+        max_workers: int - upper limit of the workers, 8 by default
+        size_hints: dict - agent result_key -> function object returning current input size relative to the usual one
+            (e.g. today's rows / average rows), {} by default
+        autoscale: boolean - flag to set autoscale bounds (from half of the estimate up to it) instead of num_workers, False by default
+        samples: int - number of the recent runs used for the estimate, 10 by default
+        days: int - number of days to look back, 30 by default
+
+    Attributes:
+        decisions: dict - agent result_key -> number of workers chosen for the last run
+
+    Usage example:
+
+        history = RunHistory('/dbfs/sinbadflow/history.db')
+        autosizer = ClusterAutosizer(history, target_seconds=900, max_workers=16,
+                                     size_hints={'/ingest': lambda: count_new_files() / 1000})
+        sf = Sinbadflow(plugins=[history, autosizer])
+    '''
+
+    def __init__(self, history, target_seconds, min_workers=1, max_workers=8, size_hints=None, autoscale=False,
+                 samples=10, days=30):
+        if min_workers < 1 or min_workers > max_workers:
+            raise ValueError(f'Wrong worker limits: min_workers={min_workers}, max_workers={max_workers}')
+        self.history = history
+        self.target_seconds = target_seconds
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.size_hints = size_hints or {}
+        self.autoscale = autoscale
+        self.samples = samples
+        self.days = days
+        self.decisions = {}
+
+    def before_run(self, agent):
+        job_args = getattr(agent, 'job_args', None)
+        if getattr(agent, 'cluster_mode', None) != 'job' or 'existing_cluster_id' in job_args:
+            return
+        workers = self.get_workers(agent)
+        if workers is None:
+            return
+        job_args = {key: value for key, value in job_args.items() if key not in ['num_workers', 'autoscale']}
+        if self.autoscale:
+            job_args['autoscale'] = {'min_workers': max(self.min_workers, math.ceil(workers / 2)), 'max_workers': workers}
+        else:
+            job_args['num_workers'] = workers
+        agent.job_args = job_args
+        self.decisions[agent.result_key] = workers
+
+    def get_workers(self, agent):
+        '''Returns the number of workers needed to finish the agent run in the target time
+
+        Args:
+            agent: BaseAgent
+
+        Returns:
+            int or None (no recorded runs of the agent)
+        '''
+        runs = [(duration, workers) for duration, workers in self.history.agent_durations(agent.data, self.days) if workers]
+        works = sorted(duration * workers for duration, workers in runs[:self.samples])
+        if not works:
+            return None
+        work = works[len(works) // 2]
+        hint = self.size_hints.get(agent.result_key)
+        if hint is not None:
+            work *= hint()
+        workers = math.ceil(work / self.target_seconds)
+        return min(self.max_workers, max(self.min_workers, workers))
@@ -0,0 +1,50 @@
+class BasePlugin():
+    '''Base class for plugin creation. Plugins override only the hooks they need, Sinbadflow registers
+    overridden hooks only, so unused hooks cost nothing during the run.
+
+    Methods:
+        before_pipeline(pipeline: Element) - called before the pipeline run \n
+        before_step(elements: list) - called before the pipeline step with all non empty step agents \n
+        before_run(agent: BaseAgent) - called in the worker thread before the agent run \n
+        after_run(agent: BaseAgent, status: Status, duration: float) - called in the worker thread after the agent run \n
+        on_skip(agent: BaseAgent) - called when the agent is skipped by the trigger or conditional function \n
+        after_step(elements: list, statuses: list) - called after the pipeline step with step agents and their statuses \n
+        after_pipeline(status_handler: StatusHandler) - called after the pipeline run (also if the run failed) \n
+        for_run() -> BasePlugin - returns the plugin used by one run submitted with Sinbadflow submit(), self by default
+            (plugins with per-run state return a fresh copy, plugins which can't serve concurrent runs raise RuntimeError)
+
+    Usage example:
+
+        class TimingPlugin(BasePlugin):
+            def after_run(self, agent, status, duration):
+                print(f'{agent.data} took {duration} s')
+
+        sf = Sinbadflow(plugins=[TimingPlugin()])
+    '''
+
+    HOOKS = ('before_pipeline', 'before_step', 'before_run', 'after_run',
+             'on_skip', 'after_step', 'after_pipeline')
+
+    def before_pipeline(self, pipeline):
+        pass
+
+    def before_step(self, elements):
+        pass
+
+    def before_run(self, agent):
+        pass
+
+    def after_run(self, agent, status, duration):
+        pass
+
+    def on_skip(self, agent):
+        pass
+
+    def after_step(self, elements, statuses):
+        pass
+
+    def after_pipeline(self, status_handler):
+        pass
+
+    def for_run(self):
+        return self
@@ -0,0 +1,75 @@
+from .base_plugin import BasePlugin
+from ..utils import Status
+from collections import namedtuple
+from enum import Enum
+import time
+
+
+class EventType(Enum):
+    '''Sinbadflow run event types'''
+    PIPELINE_STARTED = 0
+    STEP_STARTED = 1
+    AGENT_STARTED = 2
+    AGENT_FINISHED = 3
+    AGENT_SKIPPED = 4
+    STEP_FINISHED = 5
+    PIPELINE_FINISHED = 6
+
+
+RunEvent = namedtuple('RunEvent', ['type', 'step', 'agent', 'status', 'duration', 'agents', 'statuses', 'timestamp'])
+RunEvent.__doc__ = '''Sinbadflow run event. Agent events set agent/status/duration, step events set agents/statuses'''
+
+
+class EventStream(BasePlugin):
+    '''Plugin which turns lifecycle hooks into structured RunEvent objects and passes them to the callback
+    as soon as they happen. AGENT_STARTED and AGENT_FINISHED events are sent from the agent worker threads.
+
+    Args:
+        callback: function object - called with every RunEvent
+
+    Usage example:
+
+        def on_event(event):
+            if event.type == EventType.AGENT_FINISHED and event.status == Status.OK:
+                start_dashboard_refresh(event.agent.data)
+
+        sf = Sinbadflow(plugins=[EventStream(on_event)])
+
+        # or iterate over events of the run
+        for event in sf.iter_events(pipeline):
+            print(event.type, event.step)
+    '''
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.step = -1
+
+    def __emit(self, event_type, agent=None, status=None, duration=None, agents=None, statuses=None):
+        self.callback(RunEvent(event_type, self.step, agent, status, duration, agents, statuses, time.time()))
+
+    def before_pipeline(self, pipeline):
+        self.step = -1
+        self.__emit(EventType.PIPELINE_STARTED)
+
+    def before_step(self, elements):
+        self.step += 1
+        self.__emit(EventType.STEP_STARTED, agents=list(elements))
+
+    def before_run(self, agent):
+        self.__emit(EventType.AGENT_STARTED, agent=agent)
+
+    def after_run(self, agent, status, duration):
+        self.__emit(EventType.AGENT_FINISHED, agent=agent, status=status, duration=duration)
+
+    def on_skip(self, agent):
+        self.__emit(EventType.AGENT_SKIPPED, agent=agent, status=Status.SKIPPED)
+
+    def after_step(self, elements, statuses):
+        self.__emit(EventType.STEP_FINISHED, agents=list(elements), statuses=list(statuses))
+
+    def after_pipeline(self, status_handler):
+        self.__emit(EventType.PIPELINE_FINISHED)
+
+    def for_run(self):
+        # Step counter belongs to one run, the callback is shared
+        return EventStream(self.callback)
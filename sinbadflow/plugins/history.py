@@ -0,0 +1,199 @@
+from .base_plugin import BasePlugin
+from ..utils import Status, get_run_details
+import copy
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    pipeline TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    fail INTEGER NOT NULL,
+    skipped INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    position INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    fail INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    PRIMARY KEY (run_id, position)
+);
+CREATE TABLE IF NOT EXISTS agent_runs (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step INTEGER NOT NULL,
+    agent_type TEXT NOT NULL,
+    data TEXT,
+    name TEXT,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL,
+    queue_seconds REAL,
+    databricks_run_id INTEGER,
+    cluster_workers INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS agent_runs_run_id ON agent_runs(run_id);
+CREATE INDEX IF NOT EXISTS agent_runs_started_at ON agent_runs(started_at, status);
+CREATE INDEX IF NOT EXISTS agent_runs_data ON agent_runs(data, started_at);
+'''
+
+
+def get_cluster_workers(agent):
+    '''Returns the number of workers of the job cluster created for the agent
+
+    Args:
+        agent: BaseAgent
+
+    Returns:
+        int or None (agent doesn't create a job cluster)
+    '''
+    job_args = getattr(agent, 'job_args', None)
+    if getattr(agent, 'cluster_mode', None) != 'job' or 'existing_cluster_id' in job_args:
+        return None
+    autoscale = job_args.get('autoscale')
+    return autoscale.get('max_workers') if autoscale else job_args.get('num_workers', 1)
+
+
+class RunHistory(BasePlugin):
+    '''Plugin which records runs, steps and agent executions (statuses, timings, Databricks run ids) to the local
+    SQLite database. Rows are buffered in memory during the run and written with bulk inserts in one transaction
+    after the pipeline, so recording doesn't slow down the run. One pipeline is recorded at a time by one object,
+    pipelines submitted with Sinbadflow submit() are recorded by copies sharing the database connection (last_run_id
+    of the registered object is not updated by them).
+
+    Args:
+        path: string - SQLite database file, 'sinbadflow_history.db' by default
+        pipeline_name: string - name of the recorded pipeline, None by default
+
+    Methods:
+        slowest_agents(days: int, limit: int) -> list - returns agents with the highest average run duration \n
+        failure_rates(days: int, limit: int) -> list - returns agents with the highest failure rate \n
+        agent_durations(data: string, days: int) -> list - returns durations of successful agent runs \n
+        close() - closes the database connection
+
+    Usage example:
+
+        history = RunHistory('/dbfs/sinbadflow/history.db', pipeline_name='daily')
+        sf = Sinbadflow(plugins=[history])
+        sf.run(pipeline)
+        history.slowest_agents(days=30)
+    '''
+
+    def __init__(self, path='sinbadflow_history.db', pipeline_name=None):
+        self.path = path
+        self.pipeline_name = pipeline_name
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.last_run_id = None
+        self.__lock = threading.Lock()
+        self.__reset()
+
+    def __reset(self):
+        self.__started_at = time.time()
+        self.__step = -1
+        self.__step_started_at = None
+        self.__steps = []
+        self.__agent_runs = []
+
+    def before_pipeline(self, pipeline):
+        self.__reset()
+
+    def for_run(self):
+        plugin = copy.copy(self)
+        plugin.__reset()
+        return plugin
+
+    def before_step(self, elements):
+        self.__step += 1
+        self.__step_started_at = time.time()
+
+    def after_run(self, agent, status, duration):
+        # list.append is atomic, worker threads record without locking
+        self.__agent_runs.append(self.__get_agent_row(agent, status.name, time.time() - duration, duration))
+
+    def on_skip(self, agent):
+        self.__agent_runs.append(self.__get_agent_row(agent, Status.SKIPPED.name, time.time(), None))
+
+    def __get_agent_row(self, agent, status, started_at, duration):
+        details = get_run_details(agent)
+        return (self.__step, type(agent).__name__, str(agent.data), getattr(agent, 'name', None), status, started_at,
+                duration, details.get('queue_seconds'), details.get('run_id'), get_cluster_workers(agent))
+
+    def after_step(self, elements, statuses):
+        self.__steps.append((self.__step, self.__step_started_at, time.time(), statuses.count(Status.OK),
+                             statuses.count(Status.FAIL), statuses.count(Status.SKIPPED)))
+
+    def after_pipeline(self, status_handler):
+        statuses = [row[4] for row in self.__agent_runs]
+        with self.__lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO runs (pipeline, started_at, finished_at, ok, fail, skipped) VALUES (?, ?, ?, ?, ?, ?)',
+                (self.pipeline_name, self.__started_at, time.time(), statuses.count('OK'), statuses.count('FAIL'),
+                 statuses.count('SKIPPED')))
+            run_id = cursor.lastrowid
+            self.connection.executemany('INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                        [(run_id,) + row for row in self.__steps])
+            self.connection.executemany('INSERT INTO agent_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        [(run_id,) + row for row in self.__agent_runs])
+        self.last_run_id = run_id
+        self.__reset()
+
+    def __query(self, sql, args):
+        with self.__lock:
+            return self.connection.execute(sql, args).fetchall()
+
+    def slowest_agents(self, days=30, limit=10):
+        '''Returns agents with the highest average run duration
+
+        Args:
+            days: int - number of days to look back, 30 by default
+            limit: int - number of returned agents, 10 by default
+
+        Returns:
+            list (of tuples (data, agent_type, average duration, max duration, runs))
+        '''
+        return self.__query('''SELECT data, agent_type, AVG(duration), MAX(duration), COUNT(*) FROM agent_runs
+                               WHERE started_at >= ? AND status != 'SKIPPED'
+                               GROUP BY data, agent_type ORDER BY AVG(duration) DESC LIMIT ?''',
+                            (time.time() - days * 86400, limit))
+
+    def failure_rates(self, days=30, limit=10):
+        '''Returns agents with the highest failure rate (skipped runs are not counted)
+
+        Args:
+            days: int - number of days to look back, 30 by default
+            limit: int - number of returned agents, 10 by default
+
+        Returns:
+            list (of tuples (data, runs, failures, failure rate))
+        '''
+        return self.__query('''SELECT data, COUNT(*), SUM(status = 'FAIL'), AVG(status = 'FAIL') FROM agent_runs
+                               WHERE started_at >= ? AND status != 'SKIPPED'
+                               GROUP BY data ORDER BY AVG(status = 'FAIL') DESC, COUNT(*) DESC LIMIT ?''',
+                            (time.time() - days * 86400, limit))
+
+    def agent_durations(self, data, days=30):
+        '''Returns durations of successful agent runs, newest first
+
+        Args:
+            data: string - agent data (notebook path)
+            days: int - number of days to look back, 30 by default
+
+        Returns:
+            list (of tuples (duration, cluster workers))
+        '''
+        return self.__query('''SELECT duration, cluster_workers FROM agent_runs
+                               WHERE data = ? AND started_at >= ? AND status = 'OK' ORDER BY started_at DESC''',
+                            (str(data), time.time() - days * 86400))
+
+    def close(self):
+        '''Closes the database connection'''
+        self.connection.close()
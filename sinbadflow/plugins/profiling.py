@@ -0,0 +1,137 @@
+from .base_plugin import BasePlugin
+from ..utils import Logger, LogLevel
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+
+
+def get_agent_label(agent):
+    '''Returns readable agent label used in profiling reports
+
+    Args:
+        agent: BaseAgent
+
+    Returns:
+        string
+    '''
+    return f'{type(agent).__name__}({agent.data})'
+
+
+class CProfilePlugin(BasePlugin):
+    '''Plugin which captures cProfile statistics of every agent run. The profiler runs in the agent worker thread,
+    if the interpreter allows only one active profiler (Python 3.12+) concurrent agents are not profiled.
+
+    Args:
+        sort_by: string - pstats sort key used in the report, 'cumulative' by default
+        top: int - number of functions shown for each agent in the report, 20 by default
+        output_dir: string - directory to dump .prof files of every agent run, None by default
+
+    Methods:
+        report(logger: Logger) - logs profiling statistics of all agent runs
+
+    Usage example:
+
+        profiler = CProfilePlugin()
+        sf = Sinbadflow(plugins=[profiler])
+        sf.run(pipeline)
+        profiler.report()
+    '''
+
+    def __init__(self, sort_by='cumulative', top=20, output_dir=None):
+        self.sort_by = sort_by
+        self.top = top
+        self.output_dir = output_dir
+        self.results = []
+        self.__local = threading.local()
+
+    def before_run(self, agent):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None
+        self.__local.profiler = profiler
+
+    def after_run(self, agent, status, duration):
+        profiler = self.__local.profiler
+        if profiler is None:
+            return
+        profiler.disable()
+        label = get_agent_label(agent)
+        self.results.append((label, profiler))
+        if self.output_dir:
+            profiler.dump_stats(os.path.join(self.output_dir, f'{len(self.results)}_{type(agent).__name__}.prof'))
+
+    def report(self, logger=Logger(print)):
+        '''Logs profiling statistics of all agent runs
+
+        Args:
+            logger: Logger object
+        '''
+        for label, profiler in self.results:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats(self.sort_by).print_stats(self.top)
+            logger.log(f'\n-----------PROFILE: {label}-----------\n{stream.getvalue()}', LogLevel.INFO)
+
+
+class TracemallocPlugin(BasePlugin):
+    '''Plugin which captures memory allocations of every agent run with tracemalloc. Tracing is process wide,
+    allocations of agents running in parallel are visible in each other's results and the plugin can't be used by
+    pipelines submitted with Sinbadflow submit().
+
+    Args:
+        top: int - number of allocation differences stored for each agent, 10 by default
+        key_type: string - tracemalloc grouping ('lineno', 'filename', 'traceback'), 'lineno' by default
+
+    Methods:
+        report(logger: Logger) - logs the biggest allocation differences of all agent runs
+
+    Usage example:
+
+        memory = TracemallocPlugin()
+        sf = Sinbadflow(plugins=[memory])
+        sf.run(pipeline)
+        memory.report()
+    '''
+
+    def __init__(self, top=10, key_type='lineno'):
+        self.top = top
+        self.key_type = key_type
+        self.results = []
+        self.__started = False
+        self.__local = threading.local()
+
+    def before_pipeline(self, pipeline):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started = True
+
+    def before_run(self, agent):
+        self.__local.snapshot = tracemalloc.take_snapshot()
+
+    def after_run(self, agent, status, duration):
+        snapshot = tracemalloc.take_snapshot()
+        differences = snapshot.compare_to(self.__local.snapshot, self.key_type)[:self.top]
+        self.results.append((get_agent_label(agent), differences))
+
+    def after_pipeline(self, status_handler):
+        if self.__started:
+            tracemalloc.stop()
+            self.__started = False
+
+    def for_run(self):
+        # The first finished run would stop tracing of the others
+        raise RuntimeError('TracemallocPlugin traces the whole process and can not be used by submitted runs')
+
+    def report(self, logger=Logger(print)):
+        '''Logs the biggest allocation differences of all agent runs
+
+        Args:
+            logger: Logger object
+        '''
+        for label, differences in self.results:
+            lines = '\n'.join(str(difference) for difference in differences)
+            logger.log(f'\n-----------MEMORY: {label}-----------\n{lines}', LogLevel.INFO)
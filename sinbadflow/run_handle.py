@@ -0,0 +1,162 @@
+'''Handles of pipelines submitted to run in the background'''
+from .plugins import EventStream, EventType
+from collections import namedtuple
+from concurrent.futures import wait
+import threading
+
+
+RunProgress = namedtuple('RunProgress', ['state', 'finished_steps', 'total_steps', 'running_agents', 'statuses'])
+RunProgress.__doc__ = '''Progress of the submitted run (state, finished steps, steps to run, data of running agents, {status name: count})'''
+
+
+def count_steps(pipeline):
+    '''Returns the number of pipeline steps with agents to run
+
+    Args:
+        pipeline: BaseAgent object or list
+
+    Returns:
+        int
+    '''
+    if pipeline is None:
+        return 0
+    if type(pipeline) == list or type(pipeline.data) != list:
+        return 1
+    while pipeline.prev_elem is not None:
+        pipeline = pipeline.prev_elem
+    steps = 0
+    while pipeline is not None:
+        steps += any(elem.data != None for elem in pipeline.data)
+        pipeline = pipeline.next_elem
+    return steps
+
+
+class RunHandle():
+    '''Handle of the pipeline run submitted with Sinbadflow submit(). Every submission runs on its own copy of the runner
+    (own StatusHandler and ResultChannel), so several pipelines can be supervised from one session. Cancelling is
+    cooperative: steps which already started are finished, the following steps are not started.
+
+    Args:
+        runner: Sinbadflow - runner copy used only for this run
+        pipeline: BaseAgent object
+        selector: Selector - object used to run only the selected slice of the pipeline, None by default
+        executor: ThreadPoolExecutor - background workers running the submitted pipelines
+
+    Attributes:
+        status_handler: StatusHandler - statuses of the run
+        results: ResultChannel - agent results of the run
+
+    Methods:
+        progress() -> RunProgress - returns the current progress of the run \n
+        running() -> Bool - returns if the run is in progress \n
+        done() -> Bool - returns if the run is finished (or cancelled) \n
+        wait(timeout: float) -> Bool - waits for the run to finish, returns done() \n
+        cancel() -> Bool - cancels the run, returns False if the run is already finished \n
+        result(timeout: float) -> ResultChannel - waits for the run and returns its results, run error is raised
+
+    Usage example:
+
+        handle = sf.submit(pipeline)
+        handle.progress()
+        if not handle.wait(timeout=3600):
+            handle.cancel()
+        handle.result().get('counter')
+    '''
+
+    def __init__(self, runner, pipeline, selector=None, executor=None):
+        self.runner = runner
+        self.status_handler = runner.status_handler
+        self.results = runner.results
+        self.total_steps = count_steps(selector.select(pipeline) if selector else pipeline)
+        self.finished_steps = 0
+        self.__cancel_requested = False
+        self.__running_agents = {}
+        self.__lock = threading.Lock()
+        runner.register_plugin(EventStream(self.__on_event))
+        self.future = executor.submit(runner.run, pipeline, selector)
+
+    def __on_event(self, event):
+        with self.__lock:
+            if event.type == EventType.AGENT_STARTED:
+                self.__running_agents[id(event.agent)] = event.agent.data
+            elif event.type == EventType.AGENT_FINISHED:
+                self.__running_agents.pop(id(event.agent), None)
+            elif event.type == EventType.STEP_FINISHED:
+                self.finished_steps += 1
+
+    def progress(self):
+        '''Returns the current progress of the run
+
+        Returns:
+            RunProgress (state is one of PENDING, RUNNING, CANCELLING, CANCELLED, FAILED, FINISHED)
+        '''
+        with self.__lock:
+            running_agents = list(self.__running_agents.values())
+            finished_steps = self.finished_steps
+        statuses = self.status_handler.get_counts(include_open_step=True)
+        return RunProgress(self.__get_state(), finished_steps, self.total_steps, running_agents, statuses)
+
+    def __get_state(self):
+        if self.future.cancelled():
+            return 'CANCELLED'
+        if self.future.done():
+            if self.future.exception() is not None:
+                return 'FAILED'
+            return 'CANCELLED' if self.__cancel_requested and self.finished_steps < self.total_steps else 'FINISHED'
+        if self.__cancel_requested:
+            return 'CANCELLING'
+        return 'RUNNING' if self.future.running() else 'PENDING'
+
+    def running(self):
+        '''Returns if the run is in progress
+
+        Returns:
+            Bool
+        '''
+        return self.future.running()
+
+    def done(self):
+        '''Returns if the run is finished or cancelled
+
+        Returns:
+            Bool
+        '''
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        '''Waits for the run to finish
+
+        Args:
+            timeout: float - seconds to wait, None (no limit) by default
+
+        Returns:
+            Bool - True if the run is finished
+        '''
+        wait([self.future], timeout)
+        return self.future.done()
+
+    def cancel(self):
+        '''Cancels the run. Pending run is not started, running run stops after the current step.
+
+        Returns:
+            Bool - False if the run is already finished
+        '''
+        if self.future.cancel():
+            return True
+        if self.future.done():
+            return False
+        self.__cancel_requested = True
+        self.runner.cancel()
+        return True
+
+    def result(self, timeout=None):
+        '''Waits for the run and returns its results, exception of the run is raised
+
+        Args:
+            timeout: float - seconds to wait, None (no limit) by default
+
+        Returns:
+            ResultChannel
+        '''
+        self.future.result(timeout)
+        return self.results
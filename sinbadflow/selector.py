@@ -0,0 +1,121 @@
+'''Selection of pipeline slices for targeted runs'''
+from .utils import Trigger
+from .element import Element
+from fnmatch import fnmatch
+
+
+class Selector():
+    '''Selector class is used to build and run only a slice of the pipeline. Agents are selected by tag, agent type,
+    data (notebook path) glob and step position, all given criteria must match. With with_upstream flag agents which
+    the triggers of selected agents depend on are included too (previous step for OK_PREV/FAIL_PREV,
+    all previous steps for OK_ALL/FAIL_ALL).
+
+    Args:
+        tags: list - agents having at least one of the tags, None by default
+        agent_type: type or string - agent class (or class name), None by default
+        path_glob: string - fnmatch pattern matched against agent data, None by default
+        steps: slice/range/int - positions of the executed (non empty) pipeline steps, starting from 0, None by default
+        with_upstream: boolean - flag to include agents required by the triggers of selected agents, False by default
+
+    Methods:
+        matches(agent: BaseAgent, position: int) -> Bool - returns if the agent in step position is selected \n
+        select(pipeline: BaseAgent) -> BaseAgent - returns new pipeline made of selected agents (None if nothing is selected)
+
+    Usage example:
+
+        sf.run(pipeline, selector=Selector(tags=['reporting'], with_upstream=True))
+        sf.run(pipeline, selector=Selector(steps=slice(5, None)))
+        sf.run(pipeline, selector=Selector(path_glob='/reports/*'))
+    '''
+
+    def __init__(self, tags=None, agent_type=None, path_glob=None, steps=None, with_upstream=False):
+        self.tags = frozenset(tags) if tags else None
+        self.agent_type = agent_type
+        self.path_glob = path_glob
+        self.steps = steps
+        self.with_upstream = with_upstream
+
+    def matches(self, agent, position):
+        '''Returns if the agent is selected
+
+        Args:
+            agent: BaseAgent
+            position: int - position of the agent step
+
+        Returns:
+            Bool
+        '''
+        if self.tags is not None and not self.tags & getattr(agent, 'tags', frozenset()):
+            return False
+        if self.agent_type is not None and not self.__is_agent_type(agent):
+            return False
+        if self.path_glob is not None and not fnmatch(str(agent.data), self.path_glob):
+            return False
+        return self.steps is None or self.__is_step_selected(position)
+
+    def __is_agent_type(self, agent):
+        if isinstance(self.agent_type, str):
+            return self.agent_type in [cls.__name__ for cls in type(agent).__mro__]
+        return isinstance(agent, self.agent_type)
+
+    def __is_step_selected(self, position):
+        if isinstance(self.steps, int):
+            return position == self.steps
+        if isinstance(self.steps, slice):
+            start, stop, step = self.steps.start or 0, self.steps.stop, self.steps.step or 1
+            return position >= start and (stop is None or position < stop) and (position - start) % step == 0
+        return position in self.steps
+
+    def select(self, pipeline):
+        '''Returns new pipeline made of selected agents, the input pipeline is not changed
+
+        Args:
+            pipeline: BaseAgent object
+
+        Returns:
+            BaseAgent (tail element of the new pipeline) or None if no agents are selected
+        '''
+        steps = self.__get_steps(pipeline)
+        selected = [[agent for agent in step if self.matches(agent, position)]
+                    for position, step in enumerate(steps)]
+        if self.with_upstream:
+            self.__add_upstream(steps, selected)
+        return self.__build_pipeline([step for step in selected if step])
+
+    def __get_steps(self, pipeline):
+        if type(pipeline) == list:
+            pointer = Element(pipeline)
+        elif pipeline.prev_elem == None and pipeline.next_elem == None and type(pipeline.data) != list:
+            pointer = Element([pipeline])
+        else:
+            pointer = pipeline
+        while pointer.prev_elem is not None:
+            pointer = pointer.prev_elem
+        steps = []
+        while pointer is not None:
+            step = [elem for elem in pointer.data if elem.data != None]
+            if step:
+                steps.append(step)
+            pointer = pointer.next_elem
+        return steps
+
+    def __add_upstream(self, steps, selected):
+        # Walk backwards, so included upstream agents pull their own upstreams in
+        include_previous, include_all_before = False, -1
+        for position in reversed(range(len(steps))):
+            if include_previous or position < include_all_before:
+                selected[position] = list(steps[position])
+            triggers = {agent.trigger for agent in selected[position]}
+            include_previous = bool(triggers & {Trigger.OK_PREV, Trigger.FAIL_PREV})
+            if triggers & {Trigger.OK_ALL, Trigger.FAIL_ALL}:
+                include_all_before = max(include_all_before, position)
+
+    def __build_pipeline(self, steps):
+        tail = None
+        for step in steps:
+            elem = Element(step)
+            if tail is not None:
+                tail.next_elem = elem
+                elem.prev_elem = tail
+            tail = elem
+        return tail
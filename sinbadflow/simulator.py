@@ -0,0 +1,148 @@
+'''Discrete-event simulation of Sinbadflow pipeline runs'''
+from .utils import StatusHandler, Status
+from .element import Element
+from collections import namedtuple
+import heapq
+import os
+import random
+
+
+SimulationResult = namedtuple('SimulationResult', ['makespan', 'worker_utilisation', 'cluster_seconds', 'statuses'])
+SimulationResult.__doc__ = '''Result of the single simulated run (seconds, utilisation ratio, cluster-seconds, {status name: count})'''
+
+SimulationSummary = namedtuple('SimulationSummary', ['runs', 'mean_makespan', 'p50_makespan', 'p95_makespan',
+                                                     'mean_worker_utilisation', 'mean_cluster_seconds', 'mean_statuses'])
+SimulationSummary.__doc__ = '''Aggregated results of the simulated runs'''
+
+
+class PipelineSimulator():
+    '''PipelineSimulator replays Sinbadflow run of the pipeline on a virtual clock. Agent durations and failures are
+    sampled from the given distributions, triggers are resolved with StatusHandler and every step is scheduled on the
+    executor worker slots like ThreadPoolExecutor.map does. Conditional functions are not called, agents are treated
+    as passing them.
+
+    Args:
+        pipeline: BaseAgent object
+        durations: dict - agent result_key -> seconds (number) or function(random.Random) -> seconds, {} by default
+        failure_probabilities: dict - agent result_key -> probability of the agent failure, {} by default
+        default_duration: number or function(random.Random) - duration of agents missing in durations, 60 by default
+        default_failure_probability: float - failure probability of agents missing in failure_probabilities, 0 by default
+        max_workers: int - executor worker slots per step, ThreadPoolExecutor default by default
+        seed: int - random generator seed, None by default
+
+    Methods:
+        simulate_once() -> SimulationResult - simulates single pipeline run \n
+        simulate(runs: int) -> SimulationSummary - simulates the runs and aggregates the results
+
+    Usage example:
+
+        durations = {'/ingest': lambda rng: rng.lognormvariate(6, 0.3), '/report': 120}
+        simulator = PipelineSimulator(pipeline, durations, {'/ingest': 0.05}, max_workers=4)
+        summary = simulator.simulate(10000)
+    '''
+
+    def __init__(self, pipeline, durations=None, failure_probabilities=None, default_duration=60,
+                 default_failure_probability=0.0, max_workers=None, seed=None):
+        self.durations = durations or {}
+        self.failure_probabilities = failure_probabilities or {}
+        self.default_duration = default_duration
+        self.default_failure_probability = default_failure_probability
+        self.max_workers = max_workers if max_workers else min(32, (os.cpu_count() or 1) + 4)
+        self.rng = random.Random(seed)
+        self.steps = self.__compile_steps(pipeline)
+
+    def __compile_steps(self, pipeline):
+        # Steps are flattened to tuples once, so every simulated run only samples numbers
+        if type(pipeline) == list:
+            pipeline = Element(pipeline)
+        elif type(pipeline.data) != list:
+            # Single agent, pipeline steps (also an unlinked one, e.g. built or selected single step) hold lists
+            pipeline = Element([pipeline])
+        pointer = pipeline
+        while pointer.prev_elem is not None:
+            pointer = pointer.prev_elem
+        steps = []
+        while pointer is not None:
+            agents = [self.__compile_agent(elem) for elem in pointer.data if elem.data != None]
+            if agents:
+                steps.append(agents)
+            pointer = pointer.next_elem
+        return steps
+
+    def __compile_agent(self, agent):
+        key = agent.result_key if hasattr(agent, 'result_key') else str(agent.data)
+        duration = self.durations.get(key, self.default_duration)
+        failure_probability = self.failure_probabilities.get(key, self.default_failure_probability)
+        return (agent.trigger, duration, failure_probability, self.__get_cluster_nodes(agent))
+
+    def __get_cluster_nodes(self, agent):
+        # Only job clusters are created (and billed) for the run, driver node included
+        job_args = getattr(agent, 'job_args', None)
+        if getattr(agent, 'cluster_mode', None) != 'job' or 'existing_cluster_id' in job_args:
+            return 0
+        autoscale = job_args.get('autoscale')
+        workers = autoscale.get('max_workers', 1) if autoscale else job_args.get('num_workers', 1)
+        return workers + 1
+
+    def simulate_once(self):
+        '''Simulates single pipeline run
+
+        Returns:
+            SimulationResult
+        '''
+        rng = self.rng
+        status_handler = StatusHandler()
+        clock = busy_seconds = capacity_seconds = cluster_seconds = 0.0
+        statuses = {'OK': 0, 'FAIL': 0, 'SKIPPED': 0}
+        for step in self.steps:
+            step_statuses, durations = [], []
+            for trigger, duration, failure_probability, nodes in step:
+                if not status_handler.is_status_mapped_to_trigger(trigger):
+                    step_statuses.append(Status.SKIPPED)
+                    continue
+                seconds = duration(rng) if callable(duration) else duration
+                durations.append(seconds)
+                cluster_seconds += seconds * nodes
+                step_statuses.append(Status.FAIL if rng.random() < failure_probability else Status.OK)
+            for status in step_statuses:
+                statuses[status.name] += 1
+            status_handler.add_status(step_statuses)
+            if not durations:
+                continue
+            step_makespan, workers = self.__schedule(durations)
+            clock += step_makespan
+            busy_seconds += sum(durations)
+            capacity_seconds += step_makespan * workers
+        utilisation = busy_seconds / capacity_seconds if capacity_seconds else 0.0
+        return SimulationResult(clock, utilisation, cluster_seconds, statuses)
+
+    def __schedule(self, durations):
+        workers = min(len(durations), self.max_workers)
+        if workers == len(durations):
+            return max(durations), workers
+        # Tasks are taken in submission order by the first free worker
+        free_at = [0.0] * workers
+        for seconds in durations:
+            heapq.heapreplace(free_at, free_at[0] + seconds)
+        return max(free_at), workers
+
+    def simulate(self, runs=1000):
+        '''Simulates the runs and aggregates the results
+
+        Args:
+            runs: int - number of simulated runs, 1000 by default
+
+        Returns:
+            SimulationSummary
+        '''
+        results = [self.simulate_once() for _ in range(runs)]
+        makespans = sorted(result.makespan for result in results)
+        mean_statuses = {name: sum(result.statuses[name] for result in results) / runs
+                         for name in ['OK', 'FAIL', 'SKIPPED']}
+        return SimulationSummary(runs,
+                                 sum(makespans) / runs,
+                                 makespans[int(0.5 * (runs - 1))],
+                                 makespans[int(0.95 * (runs - 1))],
+                                 sum(result.worker_utilisation for result in results) / runs,
+                                 sum(result.cluster_seconds for result in results) / runs,
+                                 mean_statuses)
@@ -2,3 +2,7 @@
 from .logger import LogLevel, Logger
 from .status_handler import Status, Trigger, StatusHandler
 from .applier import apply_conditional_func
+from .condition_cache import CacheScope, ConditionCache, cache_scope
+from .run_details import get_run_details, set_run_details
+from .metrics import MetricsCollector
+from .result_channel import ResultChannel, SharedBuffer, get_run_results, run_with_results
@@ -0,0 +1,139 @@
+from enum import IntEnum
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import threading
+from .result_channel import get_run_results, run_with_results
+
+
+class CacheScope(IntEnum):
+    '''Conditional function result caching scopes'''
+    AGENT = 0
+    STEP = 1
+    RUN = 2
+
+
+def cache_scope(scope):
+    '''Decorator which sets the caching scope of the conditional function
+
+    Args:
+        scope: CacheScope
+
+    Usage example:
+
+        @cache_scope(CacheScope.RUN)
+        def is_monday():
+            return date.today().weekday() == 0
+    '''
+    def decorator(f):
+        f.cache_scope = scope
+        return f
+    return decorator
+
+
+class ConditionCache():
+    '''ConditionCache class is a part of Sinbadflow used for conditional function evaluation. Every function is evaluated
+    once per its caching scope (CacheScope.AGENT - every agent, CacheScope.STEP - once per pipeline step,
+    CacheScope.RUN - once per pipeline run), concurrent callers of the same function wait for the single evaluation.
+
+    Args:
+        default_scope: CacheScope - scope of the functions without cache_scope decorator, CacheScope.STEP by default
+        max_workers: int - number of threads evaluating the functions concurrently (shared by all steps and prefetching), 16 by default
+
+    Methods:
+        evaluate(func: function) -> Bool - returns (cached) result of the conditional function \n
+        evaluate_all(funcs: list) -> list - evaluates the functions concurrently \n
+        prefetch(funcs: list) - starts background evaluation of CacheScope.RUN functions \n
+        invalidate(scope: CacheScope) - drops the results cached with the scope or narrower
+    '''
+
+    def __init__(self, default_scope=CacheScope.STEP, max_workers=16):
+        self.default_scope = default_scope
+        self.max_workers = max_workers
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sinbadflow_condition')
+        self.__results = {}
+        self.__lock = threading.Lock()
+
+    def get_scope(self, func):
+        '''Returns caching scope of the function
+
+        Args:
+            func: function object
+
+        Returns:
+            CacheScope
+        '''
+        return getattr(func, 'cache_scope', self.default_scope)
+
+    def evaluate(self, func):
+        '''Returns result of the conditional function, evaluates it if it's not cached
+
+        Args:
+            func: function object
+
+        Returns:
+            Bool
+        '''
+        if self.get_scope(func) == CacheScope.AGENT:
+            return func()
+        with self.__lock:
+            future = self.__results.get(func)
+            is_owner = future is None
+            if is_owner:
+                future = self.__results[func] = Future()
+        if is_owner:
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def evaluate_all(self, funcs):
+        '''Evaluates the functions concurrently, every uncached function is called once
+
+        Args:
+            funcs: list (of function objects)
+
+        Returns:
+            list (of Bool) in the same order as funcs
+        '''
+        pending = list(dict.fromkeys(f for f in funcs if self.get_scope(f) != CacheScope.AGENT
+                                     and not self.__is_cached(f)))
+        per_agent = [i for i, f in enumerate(funcs) if self.get_scope(f) == CacheScope.AGENT]
+        if len(pending) + len(per_agent) < 2:
+            return [self.evaluate(f) for f in funcs]
+        # Conditions read the result channel of the run which evaluates them
+        channel = get_run_results()
+        agent_futures = {i: self.__executor.submit(run_with_results, channel, funcs[i]) for i in per_agent}
+        wait([self.__executor.submit(run_with_results, channel, self.evaluate, f) for f in pending] +
+             list(agent_futures.values()))
+        return [agent_futures[i].result() if i in agent_futures else self.evaluate(f) for i, f in enumerate(funcs)]
+
+    def prefetch(self, funcs):
+        '''Starts background evaluation of CacheScope.RUN functions, narrower scopes might depend on
+        the current step results and are not prefetched
+
+        Args:
+            funcs: list (of function objects)
+        '''
+        for f in dict.fromkeys(funcs):
+            if self.get_scope(f) == CacheScope.RUN and not self.__is_cached(f):
+                self.__executor.submit(run_with_results, get_run_results(), self.__evaluate_quietly, f)
+
+    def invalidate(self, scope=CacheScope.RUN):
+        '''Drops cached results of the functions with the scope or narrower
+
+        Args:
+            scope: CacheScope, CacheScope.RUN (everything) by default
+        '''
+        with self.__lock:
+            self.__results = {f: future for f, future in self.__results.items()
+                              if self.get_scope(f) > scope}
+
+    def __is_cached(self, func):
+        return self.get_scope(func) != CacheScope.AGENT and func in self.__results
+
+    def __evaluate_quietly(self, func):
+        # Exceptions are raised once the result is read by the executor
+        try:
+            self.evaluate(func)
+        except Exception:
+            pass
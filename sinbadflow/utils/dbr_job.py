@@ -1,5 +1,7 @@
 import requests
 import json
+import threading
+from collections import namedtuple
 import time
 import logging
 from ..settings.dbr_vars import *
@@ -25,6 +27,77 @@ class NoTokenError(Exception):
     pass
 
 
+class NoWorkspaceError(Exception):
+    '''Custom exception class used in WorkspacePool class'''
+    pass
+
+
+StallEvent = namedtuple('StallEvent', ['run_id', 'notebook_path', 'state', 'reason', 'seconds', 'attempt', 'resubmitted'])
+StallEvent.__doc__ = '''Stalled Databricks run reported by RunWatchdog (the run is cancelled)'''
+
+
+class RunWatchdog():
+    '''RunWatchdog detects job runs stuck before they start (e.g. waiting for cluster capacity). Stalled runs are
+    cancelled and resubmitted up to max_resubmits times, optionally with fallback cluster parameters (e.g. other node
+    type). RunStatusError is raised if the run is still stalled after the last resubmission.
+
+    Args:
+      max_state_seconds: dict - run life cycle state -> maximum seconds in the state, {'PENDING': 900} by default
+      heartbeat_seconds: float - maximum seconds without run state/state message change before the run is RUNNING, None by default
+      max_resubmits: int - number of resubmissions of the stalled run, 1 by default
+      fallback_job_args: dict - new_cluster parameters used for resubmissions (e.g. {'node_type_id': 'Standard_DS4_v2'}), None by default
+      on_stall: function object - called with every StallEvent, None by default
+
+    Attributes:
+      events: list - reported StallEvents
+
+    Methods:
+      get_stall_reason(state: string, state_seconds: float, unchanged_seconds: float) -> string - returns why the run is stalled (None if it's not) \n
+      report(event: StallEvent) - stores and reports the stall event
+
+    Usage example:
+
+        JobSubmitter.set_watchdog(RunWatchdog({'PENDING': 600}, fallback_job_args={'node_type_id': 'Standard_E4s_v3'}))
+    '''
+
+    def __init__(self, max_state_seconds=None, heartbeat_seconds=None, max_resubmits=1, fallback_job_args=None,
+                 on_stall=None):
+        self.max_state_seconds = max_state_seconds if max_state_seconds is not None else {'PENDING': 900}
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_resubmits = max_resubmits
+        self.fallback_job_args = fallback_job_args
+        self.on_stall = on_stall
+        self.events = []
+
+    def get_stall_reason(self, state, state_seconds, unchanged_seconds):
+        '''Returns why the run is stalled
+
+        Args:
+          state: string - run life cycle state
+          state_seconds: float - seconds the run is in the state
+          unchanged_seconds: float - seconds since the last change of the run state or state message
+
+        Returns:
+          string or None (the run is not stalled)'''
+        max_seconds = self.max_state_seconds.get(state)
+        if max_seconds is not None and state_seconds > max_seconds:
+            return f'{state} longer than {max_seconds} seconds'
+        if self.heartbeat_seconds is not None and state != 'RUNNING' and unchanged_seconds > self.heartbeat_seconds:
+            return f'no progress for {self.heartbeat_seconds} seconds'
+        return None
+
+    def report(self, event):
+        '''Stores and reports the stall event
+
+        Args:
+          event: StallEvent'''
+        self.events.append(event)
+        logging.warning(f'Run {event.run_id} of {event.notebook_path} stalled in {event.state} ({event.reason}), '
+                        f'run cancelled{", resubmitting" if event.resubmitted else ""}')
+        if self.on_stall:
+            self.on_stall(event)
+
+
 # Native Databricks variable setup - will only work in Databricks environment
 try:
     spark = get_spark()
@@ -35,28 +108,186 @@ except:
 # Native Databricks variable setup - will only work in Databricks environment
 
 
+class Workspace():
+    '''Databricks workspace with its own access token and limit of concurrent job runs, used in WorkspacePool
+
+    Args:
+      instance: string - workspace url, e.g. 'https://adb-1234567890123456.7.azuredatabricks.net'
+      token: string - workspace access token
+      max_concurrent_runs: int - job runs submitted to the workspace at the same time, 1000 by default (Databricks limit)
+      cluster_ids: list - existing cluster ids of the workspace, agents using them are pinned to the workspace
+      instance_pool_ids: list - instance pool ids of the workspace, agents using them are pinned to the workspace
+
+    Methods:
+      call_api(method: string, endpoint: string, payload: dict) -> requests.Response - calls workspace REST API 2.0 endpoint \n
+      owns(job_args: dict) -> Bool - returns if the cluster/pool of job_args belongs to the workspace'''
+
+    def __init__(self, instance, token, max_concurrent_runs=1000, cluster_ids=(), instance_pool_ids=()):
+        self.instance = instance.rstrip('/')
+        self.token = token
+        self.max_concurrent_runs = max_concurrent_runs
+        self.cluster_ids = frozenset(cluster_ids)
+        self.instance_pool_ids = frozenset(instance_pool_ids)
+        self.active_runs = 0
+
+    def call_api(self, method, endpoint, payload=None):
+        '''Calls workspace REST API 2.0 endpoint
+
+        Args:
+          method: string - 'get' or 'post'
+          endpoint: string - endpoint name, e.g. 'clusters/start'
+          payload: dict - query parameters (get) or json body (post), None by default
+
+        Returns:
+          requests.Response'''
+        url = f'{self.instance}/api/2.0/{endpoint}'
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if method == 'get':
+            return requests.get(url, params=payload, headers=headers)
+        return requests.post(url, json=payload, headers=headers)
+
+    def owns(self, job_args):
+        '''Returns if the existing cluster or instance pool of job_args belongs to the workspace
+
+        Args:
+          job_args: dict
+
+        Returns:
+          Bool'''
+        return (job_args.get('existing_cluster_id') in self.cluster_ids or
+                job_args.get('instance_pool_id') in self.instance_pool_ids)
+
+    def __repr__(self):
+        return f'Workspace({self.instance})'
+
+
+class WorkspacePool():
+    '''WorkspacePool routes job submissions to the least loaded workspace (active runs relative to max_concurrent_runs),
+    so big fan-outs are not capped by the quotas of a single workspace. Submissions wait if all workspaces are full.
+    Agents using existing cluster or instance pool are pinned to the workspace which declares it.
+
+    Args:
+      workspaces: list (of Workspace)
+
+    Methods:
+      acquire(job_args: dict) -> Workspace - reserves a run slot in the least loaded workspace \n
+      release(workspace: Workspace) - frees the run slot \n
+      get_owner(job_args: dict) -> Workspace - returns the workspace of the cluster/pool of job_args
+
+    Usage example:
+
+        JobSubmitter.set_workspace_pool(WorkspacePool([
+            Workspace('https://adb-1.azuredatabricks.net', token_1, max_concurrent_runs=150),
+            Workspace('https://adb-2.azuredatabricks.net', token_2, max_concurrent_runs=150, cluster_ids=['0101-abc'])]))
+    '''
+
+    def __init__(self, workspaces):
+        if not workspaces:
+            raise NoWorkspaceError('WorkspacePool needs at least one workspace')
+        self.workspaces = list(workspaces)
+        self.__condition = threading.Condition()
+
+    def acquire(self, job_args=None):
+        '''Reserves a run slot in the least loaded workspace, waits if all workspaces are full
+
+        Args:
+          job_args: dict - agent job arguments used for workspace pinning, None by default
+
+        Returns:
+          Workspace'''
+        candidates = self.__get_candidates(job_args or {})
+        with self.__condition:
+            while True:
+                free = [ws for ws in candidates if ws.active_runs < ws.max_concurrent_runs]
+                if free:
+                    workspace = min(free, key=lambda ws: ws.active_runs / ws.max_concurrent_runs)
+                    workspace.active_runs += 1
+                    return workspace
+                self.__condition.wait()
+
+    def __get_candidates(self, job_args):
+        if 'existing_cluster_id' not in job_args and 'instance_pool_id' not in job_args:
+            return self.workspaces
+        owners = [ws for ws in self.workspaces if ws.owns(job_args)]
+        if owners:
+            return owners
+        if any(ws.cluster_ids or ws.instance_pool_ids for ws in self.workspaces):
+            raise NoWorkspaceError(f'No workspace in the pool declares the cluster/pool of job args {job_args}')
+        return self.workspaces
+
+    def get_owner(self, job_args):
+        '''Returns the workspace which declares the existing cluster or instance pool of job_args
+
+        Args:
+          job_args: dict
+
+        Returns:
+          Workspace, the only workspace of the pool if none declares the cluster/pool
+
+        Raises:
+          NoWorkspaceError - the owner can't be determined'''
+        owners = [ws for ws in self.workspaces if ws.owns(job_args)]
+        if owners:
+            return owners[0]
+        if len(self.workspaces) == 1:
+            return self.workspaces[0]
+        raise NoWorkspaceError(f'No workspace in the pool declares the cluster/pool of job args {job_args}')
+
+    def release(self, workspace):
+        '''Frees the run slot reserved with acquire()
+
+        Args:
+          workspace: Workspace'''
+        with self.__condition:
+            workspace.active_runs -= 1
+            self.__condition.notify_all()
+
+
 class JobSubmitter():
-    '''JobSubmitter object runs databricks notebook on job or interactive cluster.
+    '''JobSubmitter object runs databricks notebook on job or interactive cluster. Job runs are submitted to the given
+    workspace, to the workspace chosen by the workspace pool (if set) or to DATABRICKS_INSTANCE with the class access token.
+    Interactive mode with 'existing_cluster_id' in job_args submits the notebook to the cluster through the Jobs API
+    as well, otherwise dbutils.notebook.run is used (works inside Databricks only and takes a driver thread per notebook).
 
     Attributes:
       cluster_mode: string - Databricks cluster mode to run the job (interactive/job supported)
       job_args: dictionary - Databricks notebook arguments
+      workspace: Workspace - workspace used for job runs, None by default
+      watchdog: RunWatchdog - stall detection of the job runs, class watchdog is used if None, None by default
+      poll_seconds: float (class attribute) - interval of run state checks, 10 by default
 
     Methods:
       set_access_token (token: string) (class method) - sets up access token for cluster creation \n
-      submit_notebook(notebook_path: string, timeout: int, args:dict) - submits notebook to job cluster \n
-      get_job_info(run_id: int) - gets the info about specific run_id'''
+      set_workspace_pool (pool: WorkspacePool) (class method) - routes job runs to the workspaces of the pool \n
+      set_watchdog (watchdog: RunWatchdog) (class method) - sets stall detection of all job runs \n
+      get_api(job_args: dict, workspace: Workspace) -> Workspace or JobSubmitter (class method) - returns the API client of the cluster/pool \n
+      submit_notebook(notebook_path: string, timeout: int, args:dict) -> string - submits notebook to job cluster, returns notebook exit value \n
+      get_job_info(run_id: int) - gets the info about specific run_id \n
+      get_notebook_output(run_id: int) -> string - gets the notebook exit value of the finished run
+
+    Attributes set after the job run:
+      run_id: int - Databricks run id of the job
+      queue_seconds: float - time the run waited for the cluster (run setup duration)'''
 
     __access_token = None
     DATABRICKS_INSTANCE = 'https://westeurope.azuredatabricks.net'
+    workspace_pool = None
+    watchdog = None
+    poll_seconds = 10
     safety_timeout = None
+    queue_seconds = None
+    run_id = None
 
-    def __init__(self, cluster_mode, input_job_args):
+    def __init__(self, cluster_mode, input_job_args, workspace=None, watchdog=None):
         if cluster_mode in ['interactive', 'job']:
             self.cluster_mode = cluster_mode
         else:
             raise WrongModeSelected(
-                f'Wrong cluster_mode selected, Dbr object supports "interactive" or "job" modes, {self.cluster_mode} was passed')
+                f'Wrong cluster_mode selected, Dbr object supports "interactive" or "job" modes, {cluster_mode} was passed')
+        self.workspace = workspace
+        if watchdog is not None:
+            self.watchdog = watchdog
+        self.__input_job_args = input_job_args
 
         self.__job_args = {
             "new_cluster": {
@@ -69,6 +300,22 @@ class JobSubmitter():
             "notebook_task": {
                 "notebook_path": None},
             "notebook_params": {}}
+        self.__set_cluster_job_args(dict(input_job_args))
+
+    def __set_cluster_job_args(self, input_job_args):
+        # Run on an already started (or pre-warmed) cluster instead of a new one
+        if 'existing_cluster_id' in input_job_args:
+            del self.__job_args['new_cluster']
+            self.__job_args['existing_cluster_id'] = input_job_args['existing_cluster_id']
+            return
+        # Node types are taken from the instance pool, defaults must not be sent
+        if 'instance_pool_id' in input_job_args:
+            for key in ['node_type_id', 'driver_node_type_id']:
+                if key not in input_job_args:
+                    del self.__job_args['new_cluster'][key]
+        # Autoscaled cluster must not get the default fixed size
+        if 'autoscale' in input_job_args and 'num_workers' not in input_job_args:
+            del self.__job_args['new_cluster']['num_workers']
         self.__job_args['new_cluster'].update(input_job_args)
 
     @classmethod
@@ -80,6 +327,61 @@ class JobSubmitter():
         '''
         cls.__access_token = token
 
+    @classmethod
+    def set_workspace_pool(cls, pool):
+        '''Routes job runs of all submitters without own workspace to the workspaces of the pool
+
+        Args:
+          pool: WorkspacePool or None (DATABRICKS_INSTANCE is used)
+        '''
+        cls.workspace_pool = pool
+
+    @classmethod
+    def set_watchdog(cls, watchdog):
+        '''Sets stall detection of all job runs of submitters without own watchdog
+
+        Args:
+          watchdog: RunWatchdog or None (runs wait until the timeout)
+        '''
+        cls.watchdog = watchdog
+
+    @classmethod
+    def get_api(cls, job_args=None, workspace=None):
+        '''Returns the API client (call_api method) of the workspace owning the cluster/pool of job_args: the given
+        workspace, the owner from the workspace pool (if set) or the JobSubmitter class (default instance and token)
+
+        Args:
+          job_args: dict - job arguments with 'existing_cluster_id' or 'instance_pool_id', None by default
+          workspace: Workspace - workspace of the agent, None by default
+
+        Returns:
+          Workspace or JobSubmitter class'''
+        if workspace is not None:
+            return workspace
+        if cls.workspace_pool is not None:
+            return cls.workspace_pool.get_owner(job_args or {})
+        return cls
+
+    @classmethod
+    def call_api(cls, method, endpoint, payload=None):
+        '''Calls Databricks REST API 2.0 endpoint using the access token
+
+        Args:
+          method: string - 'get' or 'post'
+          endpoint: string - endpoint name, e.g. 'clusters/start'
+          payload: dict - query parameters (get) or json body (post), None by default
+
+        Returns:
+          requests.Response'''
+        if cls.__access_token == None:
+            raise NoTokenError(
+                '\n !!! Access token missing. Use class method JobSubmitter.set_access_token(<TOKEN>) to set class method !!! \n')
+        url = f'{cls.DATABRICKS_INSTANCE}/api/2.0/{endpoint}'
+        headers = {'Authorization': f'Bearer {cls.__access_token}'}
+        if method == 'get':
+            return requests.get(url, params=payload, headers=headers)
+        return requests.post(url, json=payload, headers=headers)
+
     def submit_notebook(self, notebook_path, timeout, args):
         '''Submits notebook to run with timeout and arguments
 
@@ -87,32 +389,64 @@ class JobSubmitter():
           notebook_path: string
           timeout: int
           args: dict
+
+        Returns:
+          string - notebook exit value (dbutils.notebook.exit), None if the notebook did not set it
         '''
-        if self.cluster_mode == 'interactive':
-            dbutils.notebook.run(notebook_path, timeout, args)
-            return
+        if self.cluster_mode == 'interactive' and 'existing_cluster_id' not in self.__input_job_args:
+            return dbutils.notebook.run(notebook_path, timeout, dict(args))
+
+        if self.workspace is None and self.workspace_pool is not None:
+            self.workspace = self.workspace_pool.acquire(self.__input_job_args)
+            try:
+                return self.__run_notebook_job(notebook_path, timeout, args)
+            finally:
+                self.workspace_pool.release(self.workspace)
+        return self.__run_notebook_job(notebook_path, timeout, args)
 
-        if self.__access_token == None:
+    def __run_notebook_job(self, notebook_path, timeout, args):
+        instance, token = self.__get_instance_and_token()
+        if token == None:
             raise NoTokenError(
                 '\n !!! Access token missing. Use class method JobSubmitter.set_access_token(<TOKEN>) to set class method !!! \n')
 
         self.__set_notebook_job_args(notebook_path, timeout, args)
-        post_resp = self.__submit_job()
-        self.safety_timeout = time.time() + timeout * 1.1
-        run_status = self.__get_notebook_status(post_resp.json())
-        get_resp = self.get_job_info(post_resp.json().get('run_id'))
+        attempt = 0
+        while True:
+            post_resp = self.__submit_job()
+            self.run_id = post_resp.json().get('run_id')
+            self.safety_timeout = time.time() + timeout * 1.1
+            run_status = self.__get_notebook_status(post_resp.json())
+            if not isinstance(run_status, StallEvent):
+                break
+            self.__cancel_run(self.run_id)
+            resubmit = attempt < self.watchdog.max_resubmits
+            self.watchdog.report(run_status._replace(notebook_path=notebook_path, attempt=attempt, resubmitted=resubmit))
+            if not resubmit:
+                raise RunStatusError(f'Run {self.run_id} STALLED, {run_status.reason}, notebook: {notebook_path}')
+            attempt += 1
+            if self.watchdog.fallback_job_args and 'new_cluster' in self.__job_args:
+                self.__job_args['new_cluster'].update(self.watchdog.fallback_job_args)
+        get_resp = self.get_job_info(self.run_id)
+        self.queue_seconds = (get_resp.json().get('setup_duration') or 0) / 1000
         if run_status in ['FAILED', 'TIMEDOUT', 'CANCELED', 'SKIPPED', 'INTERNAL_ERROR']:
             raise RunStatusError(
                 f'Run {get_resp.json().get("run_id")} FAILED,  status: {run_status}, run notebook: {get_resp.json().get("run_page_url")}')
-        return
+        return self.get_notebook_output(self.run_id)
 
     def __set_notebook_job_args(self, notebook_path, timeout, args):
         self.__job_args['notebook_task']['notebook_path'] = notebook_path
-        self.__job_args['notebook_params'] = args
+        self.__job_args['notebook_params'] = dict(args)
         self.__job_args['timeout_seconds'] = timeout
 
+    def __get_instance_and_token(self):
+        if self.workspace is not None:
+            return self.workspace.instance, self.workspace.token
+        return self.DATABRICKS_INSTANCE, self.__access_token
+
     def __submit_job(self):
-        return requests.post(f'{self.DATABRICKS_INSTANCE}/api/2.0/jobs/runs/submit', json=self.__job_args, headers={'Authorization': f'Bearer {self.__access_token}'})
+        instance, token = self.__get_instance_and_token()
+        return requests.post(f'{instance}/api/2.0/jobs/runs/submit', json=self.__job_args, headers={'Authorization': f'Bearer {token}'})
 
     def get_job_info(self, run_id):
         '''Get info from the job cluster with specific run_id
@@ -122,16 +456,183 @@ class JobSubmitter():
 
         Returns:
           dict'''
-        return requests.get(f'{self.DATABRICKS_INSTANCE}/api/2.0/jobs/runs/get?run_id={run_id}', headers={'Authorization': f'Bearer {self.__access_token}'})
+        instance, token = self.__get_instance_and_token()
+        return requests.get(f'{instance}/api/2.0/jobs/runs/get?run_id={run_id}', headers={'Authorization': f'Bearer {token}'})
 
-    def __get_notebook_status(self, response):
+    def get_notebook_output(self, run_id):
+        '''Get notebook exit value of the finished run with specific run_id
 
-        while self.get_job_info(response.get('run_id')).json().get('state').get('life_cycle_state') in ['PENDING', 'RUNNING', 'TERMINATING']:
-            time.sleep(10)
+        Args:
+          run_id: int
+
+        Returns:
+          string or None'''
+        instance, token = self.__get_instance_and_token()
+        output = requests.get(f'{instance}/api/2.0/jobs/runs/get-output?run_id={run_id}',
+                              headers={'Authorization': f'Bearer {token}'}).json().get('notebook_output') or {}
+        if output.get('truncated'):
+            logging.warning(f'Output of the run {run_id} was truncated by Databricks')
+        return output.get('result')
+
+    def __cancel_run(self, run_id):
+        instance, token = self.__get_instance_and_token()
+        requests.post(f'{instance}/api/2.0/jobs/runs/cancel', json={'run_id': run_id}, headers={'Authorization': f'Bearer {token}'})
+
+    def __get_notebook_status(self, response):
+        # Returns StallEvent if the watchdog detects stalled run
+        started = changed = time.time()
+        previous = (None, None)
+        state = self.get_job_info(response.get('run_id')).json().get('state')
+        while state.get('life_cycle_state') in ['PENDING', 'RUNNING', 'TERMINATING']:
+            now = time.time()
+            current = (state.get('life_cycle_state'), state.get('state_message'))
+            if current[0] != previous[0]:
+                started = now
+            if current != previous:
+                changed = now
+            previous = current
+            if self.watchdog is not None:
+                reason = self.watchdog.get_stall_reason(current[0], now - started, now - changed)
+                if reason is not None:
+                    return StallEvent(response.get('run_id'), None, current[0], reason, now - started, 0, False)
+            time.sleep(self.poll_seconds)
             if time.time() > self.safety_timeout:
                 return 'TIMEDOUT'
+            state = self.get_job_info(response.get('run_id')).json().get('state')
 
-        state = self.get_job_info(response.get('run_id')).json().get('state')
         if state.get('life_cycle_state') in ['SKIPPED', 'INTERNAL_ERROR']:
             return state.get('life_cycle_state')
         return state.get('result_state')
+
+
+class ClusterPrewarmer():
+    '''ClusterPrewarmer starts or reserves compute for the upcoming pipeline step while the current step runs.
+    Only job mode agents are pre-warmed: agents with 'existing_cluster_id' in job_args get their cluster started,
+    agents with 'instance_pool_id' reserve idle pool instances (pool min_idle_instances is raised until the agent
+    step is dispatched, so the pool doesn't keep replacing the instances taken by the step clusters). Reservations of
+    agents which the trigger analysis marks as skipped are released right away. API calls go to the workspace owning
+    the cluster/pool (agent workspace, owner from JobSubmitter workspace pool or the default instance). One prewarmer
+    can serve several concurrent runs (Sinbadflow submit()), reservations and pool resizes are serialized.
+
+    Args:
+      terminate_unused: bool - terminate clusters started by the prewarmer if all their agents were skipped, True by default
+
+    Methods:
+      prewarm(elements: list) - starts clusters/reserves pool instances for the agents \n
+      dispatch(elements: list) - releases pool reservations of the agents which are about to start \n
+      release(elements: list, skipped: bool) - releases the reservations made for the agents
+
+    Usage example:
+
+        sf = Sinbadflow(prewarmer=ClusterPrewarmer())
+    '''
+
+    def __init__(self, terminate_unused=True):
+        self.terminate_unused = terminate_unused
+        self.__reservations = {}
+        self.__clusters = {}
+        self.__lock = threading.RLock()
+
+    def prewarm(self, elements):
+        '''Starts clusters and reserves instance pool capacity for job mode agents
+
+        Args:
+          elements: list (of BaseAgent)
+        '''
+        with self.__lock:
+            pool_deltas = {}
+            for elem in elements:
+                if getattr(elem, 'cluster_mode', None) != 'job' or id(elem) in self.__reservations:
+                    continue
+                job_args = elem.job_args
+                if 'existing_cluster_id' not in job_args and 'instance_pool_id' not in job_args:
+                    continue
+                try:
+                    api = JobSubmitter.get_api(job_args, getattr(elem, 'workspace', None))
+                except NoWorkspaceError as e:
+                    logging.warning(f'Failed to pre-warm agent {elem.data}: {e}')
+                    continue
+                if 'existing_cluster_id' in job_args:
+                    self.__reserve_cluster(elem, api, job_args['existing_cluster_id'])
+                else:
+                    # workers and the driver are taken from the same pool
+                    count = job_args.get('num_workers', 1) + 1
+                    self.__reservations[id(elem)] = ('pool', job_args['instance_pool_id'], count, api)
+                    key = (api, job_args['instance_pool_id'])
+                    pool_deltas[key] = pool_deltas.get(key, 0) + count
+            for (api, pool_id), delta in pool_deltas.items():
+                if not self.__resize_pool(api, pool_id, delta):
+                    # Nothing was reserved, nothing should be released later
+                    self.__reservations = {key: value for key, value in self.__reservations.items()
+                                           if value[0] != 'pool' or (value[3], value[1]) != (api, pool_id)}
+
+    def dispatch(self, elements):
+        '''Releases pool reservations of the agents which are about to start, their clusters take the reserved
+        idle instances. Started clusters stay reserved until release().
+
+        Args:
+          elements: list (of BaseAgent)
+        '''
+        with self.__lock:
+            self.release([elem for elem in elements if self.__reservations.get(id(elem), ('',))[0] == 'pool'])
+
+    def release(self, elements, skipped=False):
+        '''Releases reservations made for the agents
+
+        Args:
+          elements: list (of BaseAgent)
+          skipped: bool - agents were skipped, their started clusters can be terminated, False by default
+        '''
+        with self.__lock:
+            pool_deltas = {}
+            for elem in elements:
+                reservation = self.__reservations.pop(id(elem), None)
+                if reservation is None:
+                    continue
+                kind, resource_id, count, api = reservation
+                if kind == 'pool':
+                    pool_deltas[(api, resource_id)] = pool_deltas.get((api, resource_id), 0) - count
+                else:
+                    self.__release_cluster(api, resource_id, skipped)
+            for (api, pool_id), delta in pool_deltas.items():
+                self.__resize_pool(api, pool_id, delta)
+
+    def __reserve_cluster(self, elem, api, cluster_id):
+        self.__reservations[id(elem)] = ('cluster', cluster_id, 1, api)
+        key = (api, cluster_id)
+        if key in self.__clusters:
+            self.__clusters[key]['users'] += 1
+            return
+        self.__clusters[key] = {'users': 1, 'started': False, 'used': False}
+        try:
+            state = api.call_api('get', 'clusters/get', {'cluster_id': cluster_id}).json().get('state')
+            if state == 'TERMINATED':
+                api.call_api('post', 'clusters/start', {'cluster_id': cluster_id})
+                self.__clusters[key]['started'] = True
+        except Exception as e:
+            logging.warning(f'Failed to pre-warm cluster {cluster_id}: {e}')
+
+    def __release_cluster(self, api, cluster_id, skipped):
+        cluster = self.__clusters[(api, cluster_id)]
+        cluster['users'] -= 1
+        cluster['used'] = cluster['used'] or not skipped
+        if cluster['users'] > 0:
+            return
+        del self.__clusters[(api, cluster_id)]
+        if cluster['started'] and not cluster['used'] and self.terminate_unused:
+            try:
+                api.call_api('post', 'clusters/delete', {'cluster_id': cluster_id})
+            except Exception as e:
+                logging.warning(f'Failed to terminate pre-warmed cluster {cluster_id}: {e}')
+
+    def __resize_pool(self, api, pool_id, delta):
+        try:
+            pool = api.call_api('get', 'instance-pools/get', {'instance_pool_id': pool_id}).json()
+            edit_args = {key: pool[key] for key in ['instance_pool_id', 'instance_pool_name', 'node_type_id',
+                                                    'max_capacity', 'idle_instance_autotermination_minutes'] if key in pool}
+            edit_args['min_idle_instances'] = max(pool.get('min_idle_instances', 0) + delta, 0)
+            api.call_api('post', 'instance-pools/edit', edit_args)
+            return True
+        except Exception as e:
+            logging.warning(f'Failed to change idle instances of pool {pool_id}: {e}')
+            return False
@@ -0,0 +1,230 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import os
+import threading
+import tempfile
+from .run_details import get_run_details
+
+
+class Histogram():
+    '''Cumulative histogram used by MetricsCollector
+
+    Args:
+      buckets: tuple (of float) - upper bounds of the buckets, +Inf bucket is added automatically
+    '''
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        '''Adds the value to the histogram
+
+        Args:
+          value: float
+        '''
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        '''Returns list of (bound, cumulative count) tuples'''
+        total, result = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsCollector():
+    '''MetricsCollector class gathers Sinbadflow run metrics and exposes them in Prometheus/OpenMetrics text format.
+
+    Metrics:
+      sinbadflow_agent_runs_total (counter) - agent runs by agent type and status (OK/FAIL/SKIPPED) \n
+      sinbadflow_agent_duration_seconds (histogram) - agent run latency by agent type \n
+      sinbadflow_queue_duration_seconds (histogram) - time agents waited for compute (Databricks run setup) \n
+      sinbadflow_pipeline_runs_in_flight (gauge) - currently running pipelines \n
+      sinbadflow_agents_in_flight (gauge) - currently running agents \n
+      sinbadflow_workers (gauge) - workers of the currently running steps \n
+      sinbadflow_worker_utilisation (gauge) - ratio of busy workers
+
+    Args:
+      latency_buckets: tuple - histogram buckets (seconds) for agent and queue durations
+
+    Methods:
+      render() -> string - returns metrics in text format \n
+      write_to_file(path: string) - writes metrics to the file (node_exporter textfile collector) \n
+      serve(port: int, host: string) -> HTTPServer - serves metrics on http://host:port/metrics in background thread
+
+    Usage example:
+
+        metrics = MetricsCollector()
+        metrics.serve(8000)
+        sf = Sinbadflow(metrics=metrics)
+    '''
+
+    LATENCY_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200)
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.runs_total = {}
+        self.agent_durations = {}
+        self.queue_durations = {}
+        self.pipelines_in_flight = 0
+        self.agents_in_flight = 0
+        self.workers = 0
+        self.__lock = threading.Lock()
+
+    def pipeline_started(self):
+        '''Registers the start of the pipeline run'''
+        with self.__lock:
+            self.pipelines_in_flight += 1
+
+    def pipeline_finished(self):
+        '''Registers the end of the pipeline run'''
+        with self.__lock:
+            self.pipelines_in_flight -= 1
+
+    def step_started(self, workers):
+        '''Registers the workers of the started pipeline step
+
+        Args:
+          workers: int - size of the step worker pool
+        '''
+        with self.__lock:
+            self.workers += workers
+
+    def step_finished(self, workers):
+        '''Registers the end of pipeline step
+
+        Args:
+          workers: int - size of the step worker pool
+        '''
+        with self.__lock:
+            self.workers -= workers
+
+    def agent_started(self, agent):
+        '''Registers the start of agent run
+
+        Args:
+          agent: BaseAgent
+        '''
+        with self.__lock:
+            self.agents_in_flight += 1
+
+    def agent_finished(self, agent, status, duration):
+        '''Registers the end of agent run, called in the agent run thread. Agent queue time is taken from queue_seconds
+        run detail if it's recorded (see set_run_details).
+
+        Args:
+          agent: BaseAgent
+          status: Status
+          duration: float - run duration in seconds
+        '''
+        agent_type = type(agent).__name__
+        queue_seconds = get_run_details(agent).get('queue_seconds')
+        with self.__lock:
+            self.agents_in_flight -= 1
+            self.__add_status(agent_type, status.name)
+            self.__observe(self.agent_durations, agent_type, duration)
+            if queue_seconds is not None:
+                self.__observe(self.queue_durations, agent_type, queue_seconds)
+
+    def agent_skipped(self, agent):
+        '''Registers skipped agent
+
+        Args:
+          agent: BaseAgent
+        '''
+        with self.__lock:
+            self.__add_status(type(agent).__name__, 'SKIPPED')
+
+    def __add_status(self, agent_type, status_name):
+        key = (agent_type, status_name)
+        self.runs_total[key] = self.runs_total.get(key, 0) + 1
+
+    def __observe(self, histograms, agent_type, value):
+        if agent_type not in histograms:
+            histograms[agent_type] = Histogram(self.latency_buckets)
+        histograms[agent_type].observe(value)
+
+    def render(self):
+        '''Returns metrics in Prometheus text format
+
+        Returns:
+          string
+        '''
+        with self.__lock:
+            lines = self.__render_header('sinbadflow_agent_runs_total', 'counter',
+                                         'Agent runs by agent type and status')
+            for (agent_type, status), count in sorted(self.runs_total.items()):
+                lines.append(f'sinbadflow_agent_runs_total{{agent_type="{agent_type}",status="{status}"}} {count}')
+            lines += self.__render_histograms('sinbadflow_agent_duration_seconds', 'Agent run duration',
+                                              self.agent_durations)
+            lines += self.__render_histograms('sinbadflow_queue_duration_seconds', 'Agent wait time for compute',
+                                              self.queue_durations)
+            utilisation = self.agents_in_flight / self.workers if self.workers else 0.0
+            for name, description, value in [
+                    ('sinbadflow_pipeline_runs_in_flight', 'Currently running pipelines', self.pipelines_in_flight),
+                    ('sinbadflow_agents_in_flight', 'Currently running agents', self.agents_in_flight),
+                    ('sinbadflow_workers', 'Workers of the running pipeline steps', self.workers),
+                    ('sinbadflow_worker_utilisation', 'Ratio of busy workers', utilisation)]:
+                lines += self.__render_header(name, 'gauge', description)
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def __render_header(self, name, metric_type, description):
+        return [f'# HELP {name} {description}', f'# TYPE {name} {metric_type}']
+
+    def __render_histograms(self, name, description, histograms):
+        lines = self.__render_header(name, 'histogram', description)
+        for agent_type, histogram in sorted(histograms.items()):
+            for bound, count in histogram.cumulative_counts():
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'{name}_bucket{{agent_type="{agent_type}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{agent_type="{agent_type}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{agent_type="{agent_type}"}} {histogram.count}')
+        return lines
+
+    def write_to_file(self, path):
+        '''Writes metrics to the file, the file is replaced atomically
+
+        Args:
+          path: string
+        '''
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as f:
+            f.write(self.render())
+        os.replace(f.name, path)
+
+    def serve(self, port, host=''):
+        '''Serves metrics on http://host:port/metrics in the background thread
+
+        Args:
+          port: int
+          host: string, all interfaces by default
+
+        Returns:
+          HTTPServer (use shutdown() to stop it)
+        '''
+        collector = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = collector.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
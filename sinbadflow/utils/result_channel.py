@@ -0,0 +1,282 @@
+import mmap
+import os
+import tempfile
+import threading
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8, memory mapped files are used instead
+    shared_memory = None
+
+
+# Result channel of the run executed by the current thread, set by Sinbadflow and its worker threads
+_run_local = threading.local()
+
+
+def get_run_results():
+    '''Returns the result channel of the run executed by the current thread
+
+    Returns:
+        ResultChannel or None (thread doesn't run a pipeline)
+    '''
+    return getattr(_run_local, 'channel', None)
+
+
+def run_with_results(channel, func, *args):
+    '''Calls the function with the channel set as the result channel of the current thread's run
+
+    Args:
+        channel: ResultChannel or None
+        func: function object
+        args: arguments of the function
+
+    Returns:
+        object - value returned by the function
+    '''
+    previous = get_run_results()
+    _run_local.channel = channel
+    try:
+        return func(*args)
+    finally:
+        _run_local.channel = previous
+
+
+class SharedBuffer():
+    '''Handle of the buffer stored in shared memory (or in memory mapped file on Python < 3.8). The handle is picklable,
+    process pool workers can open the same buffer without copying it.
+
+    Args:
+        name: string - shared memory block name or memory mapped file path
+        nbytes: int - buffer size
+        format: string - struct format of the buffer items
+        shape: tuple - buffer shape
+
+    Methods:
+        create(value: bytes-like) -> SharedBuffer (class method) - copies the value to the new shared buffer \n
+        open() -> memoryview - returns zero-copy view of the buffer \n
+        release() - closes the buffer and frees shared memory (owner only)
+    '''
+
+    def __init__(self, name, nbytes, format, shape):
+        self.name = name
+        self.nbytes = nbytes
+        self.format = format
+        self.shape = shape
+        self.__segment = None
+        self.__owner = False
+
+    @classmethod
+    def create(cls, value):
+        '''Copies the bytes-like value to the new shared buffer
+
+        Args:
+            value: bytes-like object (bytes, bytearray, memoryview, array.array, numpy.ndarray etc.)
+
+        Returns:
+            SharedBuffer or None if the value can't be shared (not C-contiguous or unsupported format)
+        '''
+        view = memoryview(value)
+        try:
+            flat = view.cast('B')
+            flat.cast(view.format, view.shape)
+        except (TypeError, ValueError):
+            return None
+        if shared_memory is not None:
+            segment = shared_memory.SharedMemory(create=True, size=view.nbytes)
+            name = segment.name
+        else:
+            fd, name = tempfile.mkstemp(prefix='sinbadflow_')
+            os.ftruncate(fd, view.nbytes)
+            segment = mmap.mmap(fd, view.nbytes)
+            os.close(fd)
+        buffer = cls(name, view.nbytes, view.format, view.shape)
+        buffer.__segment = segment
+        buffer.__owner = True
+        buffer.__get_raw_view()[:] = flat
+        return buffer
+
+    def open(self):
+        '''Returns zero-copy view of the buffer with the original format and shape
+
+        Returns:
+            memoryview
+        '''
+        return self.__get_raw_view().cast(self.format, self.shape)
+
+    def release(self):
+        '''Closes the buffer and frees shared memory if the handle created it'''
+        segment, self.__segment = self.__segment, None
+        if segment is None:
+            return
+        try:
+            segment.close()
+        except BufferError:
+            # Views of the buffer are still in use, the segment is closed once they are gone
+            self.__segment = segment
+        if self.__owner:
+            if shared_memory is not None:
+                segment.unlink()
+            else:
+                os.remove(self.name)
+            self.__owner = False
+
+    def __get_raw_view(self):
+        if self.__segment is None:
+            if shared_memory is not None:
+                self.__segment = shared_memory.SharedMemory(name=self.name)
+            else:
+                with open(self.name, 'r+b') as f:
+                    self.__segment = mmap.mmap(f.fileno(), self.nbytes)
+        raw = self.__segment.buf if shared_memory is not None else memoryview(self.__segment)
+        return raw[:self.nbytes]
+
+    def __getstate__(self):
+        return {'name': self.name, 'nbytes': self.nbytes, 'format': self.format, 'shape': self.shape}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+class ResultChannel():
+    '''ResultChannel class is a part of Sinbadflow used to pass agent results downstream. The value returned by the agent
+    run() is published under the agent result_key and can be read by downstream agents (self.results) and
+    conditional functions (sinbadflow_instance.results). Bytes-like values bigger than shared_memory_threshold are
+    stored in shared memory and returned as zero-copy memoryview. Pipelines submitted with Sinbadflow submit() publish
+    to forked channels: reads of the parent channel made by the run (e.g. conditional functions) see the results of
+    that run, reads from other threads see the parent channel values.
+
+    Args:
+        shared_memory_threshold: int - size in bytes from which buffers are stored in shared memory, 1 MB by default
+
+    Methods:
+        publish(key: string, value: object) - publishes the value under the key \n
+        get(key: string, default: object, expected_type: type) -> object - returns the value published under the key \n
+        get_shared_buffer(key: string) -> SharedBuffer - returns picklable handle of the shared value \n
+        keys() -> list - returns published keys \n
+        condition(key: string, predicate: function) -> function - returns conditional function checking the published value \n
+        fork() -> ResultChannel - returns the channel of one run, read through this channel by the run threads \n
+        clear() - removes all values and frees shared memory
+
+    Usage example:
+
+        class CountAgent(BaseAgent):
+            def run(self):
+                return 42
+
+        sf = Sinbadflow()
+        def has_rows():
+            return sf.results.get('counter', 0) > 0
+
+        pipeline = CountAgent('counter') >> DatabricksAgent('/process', conditional_func=has_rows)
+    '''
+
+    def __init__(self, shared_memory_threshold=1024 * 1024):
+        self.shared_memory_threshold = shared_memory_threshold
+        self.parent = None
+        self.__values = {}
+        self.__types = {}
+        self.__lock = threading.Lock()
+
+    def publish(self, key, value):
+        '''Publishes the value under the key, previous value of the key is replaced
+
+        Args:
+            key: string
+            value: object
+        '''
+        stored = SharedBuffer.create(value) if self.__is_large_buffer(value) else None
+        with self.__lock:
+            previous = self.__values.get(key)
+            self.__values[key] = stored if stored is not None else value
+            self.__types[key] = type(value)
+        if isinstance(previous, SharedBuffer):
+            previous.release()
+
+    def get(self, key, default=None, expected_type=None):
+        '''Returns the value published under the key, shared buffers are returned as memoryview
+
+        Args:
+            key: string
+            default: object - returned if nothing was published under the key, None by default
+            expected_type: type - published value type check, TypeError is raised on mismatch, None by default
+
+        Returns:
+            object
+        '''
+        channel = self.__resolve()
+        if channel is not self:
+            return channel.get(key, default, expected_type)
+        with self.__lock:
+            if key not in self.__values:
+                return default
+            value, value_type = self.__values[key], self.__types[key]
+        if expected_type is not None and not issubclass(value_type, expected_type):
+            raise TypeError(f'Result "{key}" is {value_type.__name__}, expected {expected_type.__name__}')
+        return value.open() if isinstance(value, SharedBuffer) else value
+
+    def get_shared_buffer(self, key):
+        '''Returns picklable handle of the value stored in shared memory
+
+        Args:
+            key: string
+
+        Returns:
+            SharedBuffer or None if the value is not stored in shared memory
+        '''
+        value = self.__resolve().__values.get(key)
+        return value if isinstance(value, SharedBuffer) else None
+
+    def condition(self, key, predicate=bool):
+        '''Returns conditional function which checks the value published under the key (e.g. Databricks notebook output)
+
+        Args:
+            key: string
+            predicate: function object - called with the published value, bool by default
+
+        Returns:
+            function object, False is returned if nothing was published under the key
+        '''
+        def result_condition():
+            return key in self and bool(predicate(self.get(key)))
+        result_condition.__name__ = f'result_condition[{key}]'
+        return result_condition
+
+    def keys(self):
+        '''Returns published keys
+
+        Returns:
+            list
+        '''
+        return list(self.__resolve().__values)
+
+    def fork(self):
+        '''Returns the channel of one run, the run threads reading this channel get values of the forked one
+
+        Returns:
+            ResultChannel
+        '''
+        channel = ResultChannel(self.shared_memory_threshold)
+        channel.parent = self
+        return channel
+
+    def clear(self):
+        '''Removes all values and frees shared memory'''
+        with self.__lock:
+            values, self.__values, self.__types = self.__values, {}, {}
+        for value in values.values():
+            if isinstance(value, SharedBuffer):
+                value.release()
+
+    def __contains__(self, key):
+        return key in self.__resolve().__values
+
+    def __resolve(self):
+        channel = get_run_results()
+        return channel if channel is not None and channel.parent is self else self
+
+    def __is_large_buffer(self, value):
+        try:
+            return memoryview(value).nbytes >= self.shared_memory_threshold
+        except TypeError:
+            return False
@@ -0,0 +1,31 @@
+import threading
+
+
+# Details of the last agent run made by the current thread. Agents can be shared by concurrent pipeline runs,
+# so per-run details (e.g. Databricks run ids) are never stored on the agent itself.
+_run_details = threading.local()
+
+
+def set_run_details(agent, **details):
+    '''Records details of the agent run made by the current thread, readable by the hooks called after the run
+
+    Args:
+        agent: BaseAgent
+        details: run details (e.g. run_id, queue_seconds)
+    '''
+    _run_details.agent = id(agent)
+    _run_details.details = details
+
+
+def get_run_details(agent):
+    '''Returns details of the agent run made by the current thread (e.g. in the after_run hook)
+
+    Args:
+        agent: BaseAgent
+
+    Returns:
+        dict, empty if the agent wasn't run by the current thread or didn't record any details
+    '''
+    if getattr(_run_details, 'agent', None) != id(agent):
+        return {}
+    return dict(_run_details.details)
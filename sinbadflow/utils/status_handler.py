@@ -22,27 +22,43 @@ class Trigger(IntEnum):
 
 class StatusHandler():
     '''StatusHandler class is a part of Sinbadflow used for status mapping to triggers, determining if element is triggered
-    and result storage.
+    and result storage. Statuses are counted in fixed-size integer counters indexed by Status value. Every pipeline step
+    has its own fixed-size record, agents write their status to their own slot as soon as they finish (no locks),
+    the counters and last_status are updated once the step is closed.
+
+    Attributes:
+        steps: list - status records (lists of Status) of the closed steps
+        last_status: Status - status used for the _PREV triggers
 
     Methods:
         is_status_mapped_to_trigger(trigger: Status) -> Bool - returns if the trigger is mapped to current last_status variable \n
-        add_status(status: Status) - adds status to the STATUS_STORE, set last_status variable \n
+        open_step(size: int) - starts the record of the pipeline step with size agents \n
+        record(position: int, status: Status) - records the status of the agent in the open step (thread-safe) \n
+        close_step() -> list - closes the open step, updates the counters and last_status, returns the step statuses \n
+        add_status(status: Status) - records the whole step at once \n
+        get_counts(include_open_step: Bool) -> dict - returns status counts {'OK', 'FAIL', 'SKIPPED'} \n
         print_results() - prints all results from STATUS_STORE
     '''
 
+    # Triggers which depend on all statuses so far, mapped to the status all runs must have
+    ALL_TRIGGERS = {Trigger.OK_ALL: Status.OK, Trigger.FAIL_ALL: Status.FAIL}
+
     def __init__(self):
-        self.STATUS_STORE = {
-            'OK': 0,
-            'FAIL': 0,
-            'SKIPPED': 0
-        }
+        self.counters = [0] * (max(Status) + 1)
         self.status_to_trigger_map = {
-            Status.FAIL_ALL:  [Trigger.DEFAULT, Trigger.FAIL_ALL, Trigger.FAIL_PREV],
-            Status.FAIL: [Trigger.DEFAULT, Trigger.FAIL_PREV],
-            Status.OK: [Trigger.DEFAULT, Trigger.OK_PREV],
-            Status.OK_ALL: [Trigger.DEFAULT, Trigger.OK_ALL, Trigger.OK_PREV]
+            Status.FAIL_ALL:  frozenset([Trigger.DEFAULT, Trigger.FAIL_ALL, Trigger.FAIL_PREV]),
+            Status.FAIL: frozenset([Trigger.DEFAULT, Trigger.FAIL_PREV]),
+            Status.OK: frozenset([Trigger.DEFAULT, Trigger.OK_PREV]),
+            Status.OK_ALL: frozenset([Trigger.DEFAULT, Trigger.OK_ALL, Trigger.OK_PREV])
         }
         self.last_status = Status.OK_ALL
+        self.steps = []
+        self.__open_step = None
+
+    @property
+    def STATUS_STORE(self):
+        '''Status counts of the closed steps {'OK', 'FAIL', 'SKIPPED'} (read-only snapshot)'''
+        return self.get_counts()
 
     def is_status_mapped_to_trigger(self, trigger):
         '''Checks if trigger is mapped to current last_status
@@ -53,32 +69,72 @@ class StatusHandler():
         Returns:
             Bool
         '''
-        if trigger in [Trigger.OK_ALL, Trigger.FAIL_ALL]:
-            return self.__is_status_global_all_level(trigger)
-        if trigger in self.status_to_trigger_map.get(self.last_status):
-            return True
-        return False
+        all_status = self.ALL_TRIGGERS.get(trigger)
+        if all_status is not None:
+            return self.counters[all_status] == self.counters[Status.OK] + self.counters[Status.FAIL]
+        return trigger in self.status_to_trigger_map[self.last_status]
+
+    def open_step(self, size):
+        '''Starts the record of the pipeline step
 
-    def __is_status_global_all_level(self, trigger):
-        return self.STATUS_STORE[trigger.name.replace('_ALL', '')] == self.__get_total()
+        Args:
+            size: int - number of the step agents
+        '''
+        self.__open_step = [None] * size
+
+    def record(self, position, status):
+        '''Records the status of the agent in the open step. Every agent writes its own slot, so concurrent agents
+        don't need locking.
+
+        Args:
+            position: int - agent position in the step
+            status: Status
+        '''
+        self.__open_step[position] = status
+
+    def close_step(self):
+        '''Closes the open step, agents without recorded status are SKIPPED
+
+        Returns:
+            list (of Status) - statuses of the step agents
+        '''
+        statuses = [Status.SKIPPED if status is None else status for status in self.__open_step]
+        self.__open_step = None
+        for status in statuses:
+            self.counters[status] += 1
+        # Change last status if it's not skipped
+        min_status = min(statuses, default=Status.SKIPPED)
+        if min_status != Status.SKIPPED:
+            self.last_status = min_status
+        self.steps.append(statuses)
+        return statuses
 
     def add_status(self, result_statuses):
-        '''Adds status to the STATUS_STORE.
+        '''Records statuses of the whole step
 
         Args:
             result_statuses: list (of Status)
         '''
-        for rs in result_statuses:
-            self.STATUS_STORE[rs.name] += 1
-        self.__set_last_status(result_statuses)
+        self.open_step(len(result_statuses))
+        self.__open_step[:] = result_statuses
+        self.close_step()
 
-    def __set_last_status(self, result_statuses):
-        min_status = min(result_statuses)
-        # Change last status if it's not skipped
-        self.last_status = min_status if min_status != Status.SKIPPED else self.last_status
+    def get_counts(self, include_open_step=False):
+        '''Returns status counts
+
+        Args:
+            include_open_step: Bool - flag to count the statuses already recorded in the open step, False by default
 
-    def __get_total(self):
-        return self.STATUS_STORE['OK']+self.STATUS_STORE['FAIL']
+        Returns:
+            dict - {'OK': int, 'FAIL': int, 'SKIPPED': int}
+        '''
+        counters = list(self.counters)
+        open_step = self.__open_step
+        if include_open_step and open_step is not None:
+            for status in open_step:
+                if status is not None:
+                    counters[status] += 1
+        return {'OK': counters[Status.OK], 'FAIL': counters[Status.FAIL], 'SKIPPED': counters[Status.SKIPPED]}
 
     def print_results(self, logger=Logger(print)):
         '''Prints STATUSTORE results
@@ -88,8 +144,8 @@ class StatusHandler():
 
         '''
         logger.log('\n-----------RESULTS-----------', LogLevel.INFO)
-        self.STATUS_STORE['TOTAL'] = self.__get_total() + \
-            self.STATUS_STORE['SKIPPED']
-        for key in self.STATUS_STORE:
+        counts = self.get_counts()
+        counts['TOTAL'] = sum(counts.values())
+        for key in counts:
             logger.log(
-                f'{key} : {self.STATUS_STORE[key]}', LogLevel.INFO)
+                f'{key} : {counts[key]}', LogLevel.INFO)
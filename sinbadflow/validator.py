@@ -0,0 +1,171 @@
+'''Pre-flight validation of Sinbadflow pipelines'''
+from .utils import Trigger
+from .utils.dbr_job import JobSubmitter
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PipelineValidationError(Exception):
+    '''Custom exception class used in PipelineValidator class, problems attribute holds all found problems'''
+
+    def __init__(self, problems):
+        self.problems = problems
+        super(PipelineValidationError, self).__init__(
+            f'{len(problems)} problem(s) found in the pipeline:\n' + '\n'.join(f'  - {problem}' for problem in problems))
+
+
+# Cluster parameters accepted by Databricks Jobs API runs/submit new_cluster (and existing cluster selection)
+JOB_ARGS_KEYS = frozenset([
+    'existing_cluster_id', 'spark_version', 'node_type_id', 'driver_node_type_id', 'num_workers', 'autoscale',
+    'instance_pool_id', 'driver_instance_pool_id', 'policy_id', 'apply_policy_default_values', 'spark_conf',
+    'spark_env_vars', 'custom_tags', 'cluster_name', 'cluster_log_conf', 'init_scripts', 'ssh_public_keys',
+    'enable_elastic_disk', 'enable_local_disk_encryption', 'docker_image', 'runtime_engine', 'data_security_mode',
+    'single_user_name', 'aws_attributes', 'azure_attributes', 'gcp_attributes'])
+
+
+class WorkspacePathChecker():
+    '''Checks if the notebook exists in the Databricks workspace (workspace/get-status API). Without the workspace
+    the notebook is checked in every workspace of JobSubmitter workspace pool (runs can be routed to any of them)
+    or in JobSubmitter default instance.
+
+    Args:
+        workspace: Workspace - workspace to check, None by default
+
+    Usage example:
+
+        PipelineValidator(WorkspacePathChecker())
+    '''
+
+    def __init__(self, workspace=None):
+        self.workspace = workspace
+
+    def __call__(self, path):
+        if self.workspace is None and JobSubmitter.workspace_pool is not None:
+            apis = JobSubmitter.workspace_pool.workspaces
+        else:
+            apis = [JobSubmitter.get_api(workspace=self.workspace)]
+        return all(self.__is_notebook(api, path) for api in apis)
+
+    def __is_notebook(self, api, path):
+        response = api.call_api('get', 'workspace/get-status', {'path': path})
+        return response.status_code == 200 and response.json().get('object_type') == 'NOTEBOOK'
+
+
+class PipelineValidator():
+    '''PipelineValidator checks the whole pipeline before any compute is spent and reports all problems at once:
+    agent triggers, conditional functions, DatabricksAgent cluster_mode, job_args keys, timeout and notebook
+    arguments. Notebook paths are checked concurrently with the path checker - the workspace API
+    (WorkspacePathChecker) or any local stand-in function (e.g. check of the repository exported from the workspace).
+
+    Args:
+        path_checker: function object - called with the notebook path, returns if the notebook exists, None (no path check) by default
+        max_workers: int - number of concurrent path checks, 16 by default
+
+    Methods:
+        validate(pipeline: BaseAgent) -> list - returns found problems \n
+        check(pipeline: BaseAgent) - raises PipelineValidationError with all found problems
+
+    Usage example:
+
+        validator = PipelineValidator(WorkspacePathChecker())
+        validator.check(pipeline)
+
+        # or validate before every run
+        sf = Sinbadflow(validator=PipelineValidator(lambda path: os.path.exists(f'/repo{path}.py')))
+    '''
+
+    def __init__(self, path_checker=None, max_workers=16):
+        self.path_checker = path_checker
+        self.max_workers = max_workers
+
+    def validate(self, pipeline):
+        '''Returns problems found in the pipeline
+
+        Args:
+            pipeline: BaseAgent object
+
+        Returns:
+            list (of strings), empty if the pipeline is valid
+        '''
+        steps = self.__get_steps(pipeline)
+        problems = []
+        for position, agents in enumerate(steps):
+            for agent in agents:
+                label = f'Step {position}, agent {type(agent).__name__}({agent.data})'
+                problems += [f'{label}: {problem}' for problem in self.__validate_agent(agent, position)]
+        problems += self.__check_paths([agent for agents in steps for agent in agents])
+        return problems
+
+    def check(self, pipeline):
+        '''Validates the pipeline
+
+        Args:
+            pipeline: BaseAgent object
+
+        Raises:
+            PipelineValidationError - with all found problems
+        '''
+        problems = self.validate(pipeline)
+        if problems:
+            raise PipelineValidationError(problems)
+
+    def __get_steps(self, pipeline):
+        if type(pipeline) == list:
+            return [[agent for agent in pipeline if agent.data != None]]
+        if type(pipeline.data) != list:
+            return [[pipeline]]
+        while pipeline.prev_elem is not None:
+            pipeline = pipeline.prev_elem
+        steps = []
+        while pipeline is not None:
+            agents = [agent for agent in pipeline.data if agent.data != None]
+            if agents:
+                steps.append(agents)
+            pipeline = pipeline.next_elem
+        return steps
+
+    def __validate_agent(self, agent, position):
+        problems = []
+        if not isinstance(agent.trigger, Trigger):
+            problems.append(f'trigger {agent.trigger!r} is not a Trigger')
+        elif position == 0 and agent.trigger == Trigger.FAIL_PREV:
+            problems.append(f'trigger {agent.trigger.name} in the first step never runs')
+        if not callable(getattr(agent, 'conditional_func', None)):
+            problems.append('conditional_func is not callable')
+        if hasattr(agent, 'cluster_mode'):
+            problems += self.__validate_databricks_agent(agent)
+        return problems
+
+    def __validate_databricks_agent(self, agent):
+        problems = []
+        if agent.cluster_mode not in ['interactive', 'job']:
+            problems.append(f'cluster_mode "{agent.cluster_mode}" is not supported (interactive/job)')
+        job_args = agent.job_args
+        unknown = sorted(set(job_args) - JOB_ARGS_KEYS)
+        if unknown:
+            problems.append(f'unknown job_args keys {unknown}')
+        if 'num_workers' in job_args and 'autoscale' in job_args:
+            problems.append('job_args set both num_workers and autoscale')
+        if 'existing_cluster_id' in job_args and len(job_args) > 1:
+            problems.append(f'job_args {sorted(set(job_args) - {"existing_cluster_id"})} are ignored with existing_cluster_id')
+        if agent.cluster_mode == 'interactive' and job_args and 'existing_cluster_id' not in job_args:
+            problems.append('job_args are ignored in interactive mode without cluster_id')
+        if not isinstance(agent.timeout, int) or agent.timeout <= 0:
+            problems.append(f'timeout {agent.timeout!r} is not a positive integer')
+        not_strings = sorted(str(key) for key, value in agent.args.items() if not isinstance(value, str))
+        if not_strings:
+            problems.append(f'args {not_strings} are not strings (notebook widgets take string values)')
+        return problems
+
+    def __check_paths(self, agents):
+        if self.path_checker is None:
+            return []
+        paths = sorted({agent.notebook_path for agent in agents if hasattr(agent, 'notebook_path')})
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.__check_path, paths))
+        return [f'Notebook {path}: {result}' for path, result in zip(paths, results) if result is not True]
+
+    def __check_path(self, path):
+        try:
+            return True if self.path_checker(path) else 'not found'
+        except Exception as e:
+            return f'check failed ({type(e).__name__}: {e})'
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+import unittest
+from sinbadflow.agents.databricks import DatabricksAgent
+from sinbadflow.plugins import ClusterAutosizer, RunHistory
+
+
+class ClusterAutosizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = RunHistory(os.path.join(self.directory.name, 'history.db'))
+        rows = [(1, 0, 'DatabricksAgent', '/heavy', None, 'OK', time.time() - i, duration, None, None, workers)
+                for i, (duration, workers) in enumerate([(1200, 2), (600, 4), (9000, 2), (100, 1)])]
+        rows.append((1, 0, 'DatabricksAgent', '/heavy', None, 'FAIL', time.time(), 10, None, None, 100))
+        self.history.connection.executemany('INSERT INTO agent_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self.autosizer = ClusterAutosizer(self.history, target_seconds=300, max_workers=16)
+
+    def tearDown(self):
+        self.history.close()
+        self.directory.cleanup()
+
+    def test_should_size_cluster_from_history(self):
+        agent = DatabricksAgent('/heavy', cluster_mode='job', job_args={'num_workers': 1, 'instance_pool_id': 'p'})
+        self.autosizer.before_run(agent)
+        output = {'num_workers': 8, 'instance_pool_id': 'p'}
+        self.assertTrue(agent.job_args == output, f'Should get {output}, got {agent.job_args}')
+
+    def test_should_apply_size_hint_and_limits(self):
+        autosizer = ClusterAutosizer(self.history, target_seconds=300, max_workers=12, autoscale=True,
+                                     size_hints={'/heavy': lambda: 2})
+        agent = DatabricksAgent('/heavy', cluster_mode='job', job_args={'num_workers': 1})
+        autosizer.before_run(agent)
+        output = {'autoscale': {'min_workers': 6, 'max_workers': 12}}
+        self.assertTrue(agent.job_args == output, f'Should get {output}, got {agent.job_args}')
+        self.assertTrue(autosizer.decisions == {'/heavy': 12}, f'Should record the decision, got {autosizer.decisions}')
+
+    def test_should_keep_job_args_without_history(self):
+        agents = [DatabricksAgent('/new', cluster_mode='job', job_args={'num_workers': 3}),
+                  DatabricksAgent('/heavy', cluster_mode='job', job_args={'existing_cluster_id': 'c1'}),
+                  DatabricksAgent('/heavy')]
+        job_args = [agent.job_args for agent in agents]
+        for agent in agents:
+            self.autosizer.before_run(agent)
+        self.assertTrue([agent.job_args for agent in agents] == job_args, 'Should not change job_args')
+
+    def test_should_validate_limits(self):
+        self.assertRaises(ValueError, ClusterAutosizer, self.history, 300, 4, 2)
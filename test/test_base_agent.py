@@ -1,3 +1,5 @@
+import copy
+import pickle
 
 import unittest
 from sinbadflow.agents.base_agent import BaseAgent
@@ -37,3 +39,32 @@ class BaseAgentTest(unittest.TestCase):
         d = TestAgent('data', conditional_func=f)
         self.assertTrue(d.conditional_func() == 100,
                         f'Should return 100, got {d.conditional_func()}')
+
+    def test_should_share_immutable_databricks_defaults(self):
+        from sinbadflow.agents.databricks import DatabricksAgent
+        agent1 = DatabricksAgent('/notebook1')
+        agent2 = DatabricksAgent('/notebook2')
+        self.assertTrue(agent1.args is agent2.args and agent1.job_args is agent2.job_args and
+                        not hasattr(agent1, '__dict__') and agent1.notebook_path == '/notebook1',
+                        'Should share read-only defaults without instance __dict__')
+        def mutate_default():
+            agent1.args['key'] = 'value'
+        self.assertRaises(TypeError, mutate_default)
+        copied = copy.deepcopy(agent1 >> agent2)
+        restored = pickle.loads(pickle.dumps(agent1))
+        self.assertTrue(copied.data[0].notebook_path == '/notebook2' and restored.job_args == {},
+                        'Should copy and pickle agents with default arguments')
+        agent3 = DatabricksAgent('/notebook3', cluster_id='c1')
+        self.assertTrue(agent3.job_args == {'existing_cluster_id': 'c1'} and agent1.job_args == {},
+                        f'Should set existing cluster of the agent only, got {agent3.job_args}')
+
+    def test_should_assign_databricks_notebook_path(self):
+        from sinbadflow.agents.databricks import DatabricksAgent
+
+        class PrefixedAgent(DatabricksAgent):
+            def __init__(self, notebook_path, **kwargs):
+                super(PrefixedAgent, self).__init__(notebook_path, **kwargs)
+                self.notebook_path = f'/Repos/project{notebook_path}'
+        agent = PrefixedAgent('/load')
+        self.assertTrue(agent.notebook_path == '/Repos/project/load' and agent.data == '/Repos/project/load',
+                        f'Should set notebook path as agent data, got {agent.notebook_path, agent.data}')
@@ -0,0 +1,65 @@
+import time
+import unittest
+from sinbadflow.builder import PipelineBuilder
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Logger
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        pass
+
+
+def get_steps(pipeline):
+    while pipeline.prev_elem is not None:
+        pipeline = pipeline.prev_elem
+    steps = []
+    while pipeline is not None:
+        steps.append([elem.data for elem in pipeline.data])
+        pipeline = pipeline.next_elem
+    return steps
+
+
+class PipelineBuilderTest(unittest.TestCase):
+
+    def test_should_build_same_pipeline_as_rshift(self):
+        pipeline = PipelineBuilder([TestAgent('a'), [TestAgent('b'), TestAgent('c')], TestAgent('d')]).build()
+        expected = TestAgent('a') >> [TestAgent('b'), TestAgent('c')] >> TestAgent('d')
+        self.assertTrue(get_steps(pipeline) == get_steps(expected), f'Should get {get_steps(expected)}, got {get_steps(pipeline)}')
+
+    def test_should_concat_builders_and_pipelines(self):
+        builder = PipelineBuilder([TestAgent('a')])
+        other = PipelineBuilder([TestAgent('b'), TestAgent('c')])
+        builder.concat(other).add(TestAgent('d') >> TestAgent('e')).add([TestAgent('f')])
+        output = [['a'], ['b'], ['c'], ['d'], ['e'], ['f']]
+        self.assertTrue(get_steps(builder.build()) == output, f'Should get {output}, got {get_steps(builder.build())}')
+        self.assertTrue(len(builder) == 6 and len(other) == 0 and other.build() is None,
+                        'Should move all steps of the other builder')
+        self.assertRaises(ValueError, builder.concat, builder)
+
+    def test_should_continue_existing_pipeline(self):
+        pipeline = PipelineBuilder.from_pipeline(TestAgent('a') >> TestAgent('b')).add(TestAgent('c')).build()
+        self.assertTrue(get_steps(pipeline) == [['a'], ['b'], ['c']], f'Should get 3 steps, got {get_steps(pipeline)}')
+
+    def test_should_run_built_pipeline(self):
+        sf = Sinbadflow(Logger.EmptyLogger)
+        sf.run(PipelineBuilder(TestAgent(str(i)) for i in range(100)).build())
+        self.assertTrue(sf.status_handler.STATUS_STORE['OK'] == 100, 'Should run all 100 agents')
+
+    def test_should_run_single_step_pipeline(self):
+        for step in [TestAgent('a'), [TestAgent('a'), TestAgent('b')]]:
+            sf = Sinbadflow(Logger.EmptyLogger)
+            sf.run(PipelineBuilder([step]).build())
+            ok = sf.status_handler.STATUS_STORE['OK']
+            self.assertTrue(ok == (len(step) if type(step) == list else 1),
+                            f'Should run agents of the single built step, got {ok}')
+
+    def test_should_build_long_pipelines_in_linear_time(self):
+        agents = [TestAgent(str(i)) for i in range(20000)]
+        start_time = time.time()
+        builder = PipelineBuilder(agents[:10000])
+        for agent in agents[10000:]:
+            builder.concat(PipelineBuilder([agent]))
+        duration = time.time() - start_time
+        self.assertTrue(len(builder) == 20000 and duration < 1, f'Should build 20000 steps fast, took {duration} s')
@@ -0,0 +1,93 @@
+import unittest
+import threading
+import time
+from sinbadflow.utils import ConditionCache, CacheScope, cache_scope
+
+
+class ConditionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+        self.cache = ConditionCache()
+
+    def condition(self):
+        self.calls += 1
+        return True
+
+    def test_should_evaluate_step_function_once(self):
+        results = self.cache.evaluate_all([self.condition] * 5)
+        self.assertTrue(results == [True] * 5 and self.calls == 1,
+                        f'Should evaluate once, got {self.calls} calls')
+
+    def test_should_reevaluate_after_invalidation(self):
+        self.cache.evaluate(self.condition)
+        self.cache.invalidate(CacheScope.STEP)
+        self.cache.evaluate(self.condition)
+        self.assertTrue(self.calls == 2, f'Should evaluate twice, got {self.calls} calls')
+
+    def test_should_keep_run_scope_after_step_invalidation(self):
+        @cache_scope(CacheScope.RUN)
+        def condition():
+            return self.condition()
+        self.cache.evaluate(condition)
+        self.cache.invalidate(CacheScope.STEP)
+        self.cache.evaluate(condition)
+        self.assertTrue(self.calls == 1, f'Should evaluate once, got {self.calls} calls')
+
+    def test_should_evaluate_agent_scope_every_time(self):
+        self.cache.default_scope = CacheScope.AGENT
+        self.cache.evaluate_all([self.condition] * 3)
+        self.assertTrue(self.calls == 3, f'Should evaluate 3 times, got {self.calls} calls')
+
+    def test_should_evaluate_functions_concurrently(self):
+        barrier = threading.Barrier(2, timeout=1)
+
+        def first():
+            return barrier.wait() is not None
+
+        def second():
+            return barrier.wait() is not None
+        results = self.cache.evaluate_all([first, second])
+        self.assertTrue(results == [True, True], f'Should evaluate concurrently, got {results}')
+
+    def test_should_cap_evaluation_threads(self):
+        cache = ConditionCache(CacheScope.AGENT, max_workers=4)
+        threads = set()
+
+        def condition():
+            threads.add(threading.current_thread().name)
+            time.sleep(0.001)
+            return True
+        results = cache.evaluate_all([condition] * 200)
+        self.assertTrue(results == [True] * 200 and len(threads) <= 4,
+                        f'Should evaluate on at most 4 threads, got {len(threads)}')
+
+    def test_should_prefetch_run_scope_functions(self):
+        @cache_scope(CacheScope.RUN)
+        def condition():
+            return self.condition()
+        self.cache.prefetch([condition, self.condition])
+        time.sleep(0.05)
+        self.cache.evaluate(condition)
+        self.assertTrue(self.calls == 1, f'Should evaluate prefetched function once, got {self.calls} calls')
+
+    def test_should_cap_prefetch_threads(self):
+        cache = ConditionCache(max_workers=2)
+        threads = set()
+        conditions = []
+        for _ in range(20):
+            @cache_scope(CacheScope.RUN)
+            def condition():
+                threads.add(threading.current_thread().name)
+                time.sleep(0.001)
+                return True
+            conditions.append(condition)
+        cache.prefetch(conditions)
+        results = cache.evaluate_all(conditions)
+        self.assertTrue(results == [True] * 20 and len(threads) <= 2,
+                        f'Should prefetch on at most 2 threads, got {len(threads)}')
+
+    def test_should_raise_condition_error(self):
+        def broken():
+            raise ValueError('broken')
+        self.assertRaises(ValueError, lambda: self.cache.evaluate_all([broken, self.condition]))
@@ -1,6 +1,10 @@
 from sinbadflow.utils.dbr_job import *
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Logger
 from unittest.mock import patch, call, Mock
 from unittest import mock
+import threading
 import unittest
 
 
@@ -16,7 +20,8 @@ class DummyRequests():
             'noToken': 2,
             'skipped': 4,
             'canceled': 5,
-            'error': 6
+            'error': 6,
+            'output': 7
         }
         mock_resp.json = Mock(
             return_value={'run_id': path_values.get(path)})
@@ -26,13 +31,18 @@ class DummyRequests():
     def get(path, headers=None, flg=None):
 
         value = path.partition('?')[2]
+        if 'runs/get-output' in path:
+            mock_resp = Mock()
+            mock_resp.json = Mock(return_value={'notebook_output': {'result': 'done'}} if value == 'run_id=7' else {})
+            return mock_resp
         result_state_values = {
             'run_id=1': 'SUCCESS',
             'run_id=2': 'FAILED',
             'run_id=3': 'TIMEDOUT',
             'run_id=4': None,
             'run_id=5': 'CANCELED',
-            'run_id=6': 'FAILED'
+            'run_id=6': 'FAILED',
+            'run_id=7': 'SUCCESS'
         }
         life_cycle_state_values = {
             'run_id=1': 'TERMINATED',
@@ -40,7 +50,8 @@ class DummyRequests():
             'run_id=3': 'TERMINATED',
             'run_id=4': 'SKIPPED',
             'run_id=5': 'TERMINATED',
-            'run_id=6': 'INTERNAL_ERROR'
+            'run_id=6': 'INTERNAL_ERROR',
+            'run_id=7': 'TERMINATED'
         }
         mock_resp = Mock()
         mock_resp.json = Mock(
@@ -95,4 +106,251 @@ class JobSubmittTest(unittest.TestCase):
     def test_should_fail_on_internal_error(self, mock_get, mock_post):
         self.js.set_access_token('tokentokentoken')
         self.assertRaises(
-            RunStatusError, lambda: self.js.submit_notebook('error', 5, {}))
\ No newline at end of file
+            RunStatusError, lambda: self.js.submit_notebook('error', 5, {}))
+
+    def test_should_return_notebook_output(self, mock_get, mock_post):
+        self.js.set_access_token('tokentokentoken')
+        result = self.js.submit_notebook('output', 5, {})
+        self.assertTrue(result == 'done' and self.js.run_id == 7,
+                        f'Should get notebook output "done" of run 7, got {result, self.js.run_id}')
+
+    def test_should_use_existing_cluster(self, mock_get, mock_post):
+        js = JobSubmitter('job', {'existing_cluster_id': '0101-abc'})
+        job_args = js._JobSubmitter__job_args
+        self.assertTrue(job_args.get('existing_cluster_id') == '0101-abc' and 'new_cluster' not in job_args,
+                        f'Should run on existing cluster, got {job_args}')
+
+    def test_should_use_instance_pool(self, mock_get, mock_post):
+        js = JobSubmitter('job', {'instance_pool_id': 'pool-1'})
+        new_cluster = js._JobSubmitter__job_args['new_cluster']
+        self.assertTrue(new_cluster.get('instance_pool_id') == 'pool-1' and 'node_type_id' not in new_cluster
+                        and 'driver_node_type_id' not in new_cluster,
+                        f'Should create cluster from the pool without node types, got {new_cluster}')
+
+    def test_should_not_send_default_workers_with_autoscale(self, mock_get, mock_post):
+        js = JobSubmitter('job', {'autoscale': {'min_workers': 1, 'max_workers': 4}})
+        new_cluster = js._JobSubmitter__job_args['new_cluster']
+        self.assertTrue(new_cluster.get('autoscale') == {'min_workers': 1, 'max_workers': 4} and 'num_workers' not in new_cluster,
+                        f'Should create autoscaled cluster without num_workers, got {new_cluster}')
+
+    def test_should_run_interactive_notebook_on_existing_cluster(self, mock_get, mock_post):
+        self.js.set_access_token('tokentokentoken')
+        js = JobSubmitter('interactive', {'existing_cluster_id': 'c1'})
+        result = js.submit_notebook('output', 5, {'date': '2020-01-01'})
+        job_args = mock_get.call_args[1]['json']
+        self.assertTrue(result == 'done' and job_args['existing_cluster_id'] == 'c1' and 'new_cluster' not in job_args
+                        and job_args['notebook_params'] == {'date': '2020-01-01'},
+                        f'Should submit the notebook to the cluster through the Jobs API, got {job_args}')
+
+    def test_should_submit_to_workspace_from_pool(self, mock_get, mock_post):
+        workspaces = [Workspace('https://ws1', 'token1'), Workspace('https://ws2/', 'token2', cluster_ids=['c2'])]
+        JobSubmitter.set_workspace_pool(WorkspacePool(workspaces))
+        self.addCleanup(JobSubmitter.set_workspace_pool, None)
+        js = JobSubmitter('job', {'existing_cluster_id': 'c2'})
+        result = js.submit_notebook('output', 5, {})
+        calls = [(c[0][0].partition('/api/')[0], c[1]['headers']['Authorization'])
+                 for c in mock_get.call_args_list + mock_post.call_args_list]
+        self.assertTrue(result == 'done' and set(calls) == {('https://ws2', 'Bearer token2')},
+                        f'Should call the pinned workspace only, got {set(calls)}')
+        self.assertTrue(workspaces[1].active_runs == 0, 'Should release the workspace after the run')
+
+
+class RunWatchdogTest(unittest.TestCase):
+
+    def mock_post(self, url, json, headers=None):
+        self.calls.append((url.rpartition('/api/2.0/')[2], json.get('run_id'), json.get('new_cluster', {}).get('node_type_id')))
+        response = Mock()
+        response.json = Mock(return_value={'run_id': len(self.calls)})
+        return response
+
+    def mock_get(self, url, headers=None):
+        run_id = int(url.partition('run_id=')[2])
+        response = Mock()
+        state = self.states.get(run_id, {'life_cycle_state': 'TERMINATED', 'result_state': 'SUCCESS'})
+        response.json = Mock(return_value={'run_id': run_id, 'state': state, 'notebook_output': {'result': run_id}})
+        return response
+
+    def setUp(self):
+        self.calls = []
+        self.states = {}
+        self.events = []
+        for name, side_effect in [('requests.get', self.mock_get), ('requests.post', self.mock_post)]:
+            patcher = patch(name, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(JobSubmitter, 'poll_seconds', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        JobSubmitter.set_access_token('token')
+        self.watchdog = RunWatchdog({'PENDING': 0.02}, fallback_job_args={'node_type_id': 'Standard_E4s_v3'},
+                                    on_stall=self.events.append)
+
+    def test_should_cancel_and_resubmit_stalled_run(self):
+        self.states[1] = {'life_cycle_state': 'PENDING', 'state_message': 'Waiting for cluster'}
+        js = JobSubmitter('job', {}, watchdog=self.watchdog)
+        result = js.submit_notebook('nb', 60, {})
+        output = [('jobs/runs/submit', None, 'Standard_DS3_v2'), ('jobs/runs/cancel', 1, None),
+                  ('jobs/runs/submit', None, 'Standard_E4s_v3')]
+        self.assertTrue(self.calls == output, f'Should get {output}, got {self.calls}')
+        self.assertTrue(result == 3 and len(self.events) == 1 and self.events[0].resubmitted
+                        and self.events[0].notebook_path == 'nb', f'Should report the stall, got {self.events}')
+
+    def test_should_fail_after_last_resubmission(self):
+        self.states[1] = self.states[3] = {'life_cycle_state': 'PENDING', 'state_message': ''}
+        js = JobSubmitter('job', {}, watchdog=self.watchdog)
+        self.assertRaises(RunStatusError, js.submit_notebook, 'nb', 60, {})
+        self.assertTrue([event.resubmitted for event in self.events] == [True, False],
+                        f'Should report both stalls, got {self.events}')
+
+    def test_should_detect_missing_heartbeat(self):
+        watchdog = RunWatchdog({}, heartbeat_seconds=10)
+        reasons = [watchdog.get_stall_reason('PENDING', 100, 5), watchdog.get_stall_reason('PENDING', 100, 11),
+                   watchdog.get_stall_reason('RUNNING', 100, 11)]
+        self.assertTrue(reasons == [None, 'no progress for 10 seconds', None], f'Should detect missing heartbeat, got {reasons}')
+
+
+class WorkspacePoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.small = Workspace('https://small', 't', max_concurrent_runs=1, instance_pool_ids=['p1'])
+        self.big = Workspace('https://big', 't', max_concurrent_runs=4)
+        self.pool = WorkspacePool([self.small, self.big])
+
+    def test_should_route_to_least_loaded_workspace(self):
+        acquired = [self.pool.acquire().instance for _ in range(5)]
+        output = ['https://small', 'https://big', 'https://big', 'https://big', 'https://big']
+        self.assertTrue(acquired == output, f'Should get {output}, got {acquired}')
+
+    def test_should_wait_for_free_slot(self):
+        self.pool.acquire({'instance_pool_id': 'p1'})
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(self.pool.acquire({'instance_pool_id': 'p1'})))
+        thread.start()
+        thread.join(0.05)
+        self.assertTrue(acquired == [], 'Should wait for the pinned workspace')
+        self.pool.release(self.small)
+        thread.join(1)
+        self.assertTrue(acquired == [self.small], f'Should get small workspace after release, got {acquired}')
+
+    def test_should_fail_on_unknown_pinned_resources(self):
+        self.assertRaises(NoWorkspaceError, self.pool.acquire, {'existing_cluster_id': 'unknown'})
+        self.assertRaises(NoWorkspaceError, WorkspacePool, [])
+
+
+class DummyJobAgent():
+    def __init__(self, job_args):
+        self.cluster_mode = 'job'
+        self.job_args = job_args
+
+
+class PoolAgent(BaseAgent):
+    cluster_mode = 'job'
+    job_args = {'instance_pool_id': 'p'}
+
+    def __init__(self, data, event=None, **kwargs):
+        super().__init__(data, **kwargs)
+        self.event = event
+
+    def run(self):
+        if self.event is not None:
+            self.event.wait(5)
+
+
+class ClusterPrewarmerTest(unittest.TestCase):
+
+    def mock_call_api(self, method, endpoint, payload=None):
+        self.calls.append((endpoint, payload))
+        response = Mock()
+        if endpoint == 'clusters/get':
+            response.json = Mock(return_value={'state': 'TERMINATED'})
+        elif endpoint == 'instance-pools/get':
+            response.json = Mock(return_value={'instance_pool_id': payload['instance_pool_id'],
+                                               'instance_pool_name': 'pool', 'node_type_id': 'Standard_DS3_v2',
+                                               'min_idle_instances': self.min_idle})
+        elif endpoint == 'instance-pools/edit':
+            self.min_idle = payload['min_idle_instances']
+        return response
+
+    def setUp(self):
+        self.calls = []
+        self.min_idle = 1
+        self.prewarmer = ClusterPrewarmer()
+        patcher = patch.object(JobSubmitter, 'call_api', side_effect=self.mock_call_api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_should_reserve_and_release_pool_instances(self):
+        agents = [DummyJobAgent({'instance_pool_id': 'p', 'num_workers': 2}),
+                  DummyJobAgent({'instance_pool_id': 'p'})]
+        self.prewarmer.prewarm(agents)
+        reserved = self.min_idle
+        self.prewarmer.release(agents)
+        self.assertTrue(reserved == 6 and self.min_idle == 1,
+                        f'Should reserve 5 instances and release them, got {reserved, self.min_idle}')
+
+    def test_should_release_pool_instances_on_dispatch(self):
+        agents = [DummyJobAgent({'instance_pool_id': 'p', 'num_workers': 2}), DummyJobAgent({'existing_cluster_id': 'c1'})]
+        self.prewarmer.prewarm(agents)
+        self.prewarmer.dispatch(agents)
+        endpoints = [endpoint for endpoint, _ in self.calls]
+        self.assertTrue(self.min_idle == 1 and 'clusters/delete' not in endpoints,
+                        f'Should release pool instances only, got {self.min_idle, endpoints}')
+        self.prewarmer.release(agents)
+        self.assertTrue(self.min_idle == 1, f'Should not release pool instances twice, got {self.min_idle}')
+
+    def test_should_start_and_terminate_skipped_cluster(self):
+        agent = DummyJobAgent({'existing_cluster_id': 'c1'})
+        self.prewarmer.prewarm([agent])
+        self.prewarmer.release([agent], skipped=True)
+        endpoints = [endpoint for endpoint, _ in self.calls]
+        self.assertTrue(endpoints == ['clusters/get', 'clusters/start', 'clusters/delete'],
+                        f'Should start and terminate cluster, got {endpoints}')
+
+    def test_should_keep_used_cluster_running(self):
+        agents = [DummyJobAgent({'existing_cluster_id': 'c1'}), DummyJobAgent({'existing_cluster_id': 'c1'})]
+        self.prewarmer.prewarm(agents)
+        self.prewarmer.release(agents[:1], skipped=True)
+        self.prewarmer.release(agents[1:])
+        endpoints = [endpoint for endpoint, _ in self.calls]
+        self.assertTrue(endpoints == ['clusters/get', 'clusters/start'],
+                        f'Should not terminate used cluster, got {endpoints}')
+
+    def test_should_prewarm_in_owning_workspaces(self):
+        pool_workspace = Workspace('https://pools', 't1', instance_pool_ids=['p'])
+        cluster_workspace = Workspace('https://clusters', 't2', cluster_ids=['c1'])
+        workspace_calls = []
+        for workspace in [pool_workspace, cluster_workspace]:
+            workspace.call_api = Mock(side_effect=lambda method, endpoint, payload=None, instance=workspace.instance:
+                                      workspace_calls.append((instance, endpoint)) or self.mock_call_api(method, endpoint, payload))
+        JobSubmitter.set_workspace_pool(WorkspacePool([pool_workspace, cluster_workspace]))
+        self.addCleanup(JobSubmitter.set_workspace_pool, None)
+        agents = [DummyJobAgent({'instance_pool_id': 'p'}), DummyJobAgent({'existing_cluster_id': 'c1'})]
+        self.prewarmer.prewarm(agents)
+        self.prewarmer.release(agents, skipped=True)
+        pool_calls = [endpoint for instance, endpoint in workspace_calls if instance == 'https://pools']
+        cluster_calls = [endpoint for instance, endpoint in workspace_calls if instance == 'https://clusters']
+        self.assertTrue(pool_calls == ['instance-pools/get', 'instance-pools/edit'] * 2 and
+                        cluster_calls == ['clusters/get', 'clusters/start', 'clusters/delete'] and
+                        not JobSubmitter.call_api.called and self.min_idle == 1,
+                        f'Should call the owning workspaces only, got {workspace_calls}')
+
+    def test_should_release_next_step_reservations_on_cancel(self):
+        started, release = threading.Event(), threading.Event()
+        sf = Sinbadflow(Logger.EmptyLogger, prewarmer=self.prewarmer)
+        sf.add_hook('before_run', lambda agent: started.set())
+        handle = sf.submit(PoolAgent('blocked', release) >> PoolAgent('next'))
+        started.wait(5)
+        reserved = self.min_idle
+        handle.cancel()
+        release.set()
+        handle.wait(5)
+        self.assertTrue(reserved == 3 and self.min_idle == 1 and handle.progress().state == 'CANCELLED',
+                        f'Should release instances reserved for the cancelled step, got {reserved, self.min_idle}')
+
+    def test_should_release_next_step_reservations_on_step_error(self):
+        def failing_condition():
+            raise ValueError('condition failed')
+        sf = Sinbadflow(Logger.EmptyLogger, prewarmer=self.prewarmer)
+        pipeline = PoolAgent('first', conditional_func=failing_condition) >> PoolAgent('next')
+        self.assertRaises(ValueError, lambda: sf.run(pipeline))
+        self.assertTrue(self.min_idle == 1, f'Should release instances reserved for the next step, got {self.min_idle}')
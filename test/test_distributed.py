@@ -0,0 +1,97 @@
+import unittest
+import socket
+import threading
+import time
+from multiprocessing.connection import Listener
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.distributed import Worker, Coordinator, RemoteAgentError, WorkerLostError
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Logger, Trigger
+
+
+class RemoteAgent(BaseAgent):
+    def __init__(self, data, trigger=Trigger.DEFAULT, **kwargs):
+        self.number = 10
+        super(RemoteAgent, self).__init__(data, trigger, **kwargs)
+
+    def run(self):
+        if 'slow' in self.data:
+            time.sleep(0.5)
+        if 'fail' in self.data:
+            raise ValueError('remote failure')
+        print(f'running {self.data}')
+        self.number = self.number * 10
+        return self.data.upper()
+
+
+def get_free_address():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()
+
+
+def start_hung_worker(authkey):
+    listener = Listener(('127.0.0.1', 0), authkey=authkey)
+    connections = []
+
+    def accept():
+        conn = listener.accept()
+        conn.recv()
+        connections.append(conn)
+    threading.Thread(target=accept, daemon=True).start()
+    return listener
+
+
+class DistributedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = Worker(b'test', ('127.0.0.1', 0)).start()
+        self.coordinator = Coordinator([self.worker.address], b'test', slots_per_worker=2,
+                                       logging_option=Logger.EmptyLogger)
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def test_should_run_agent_on_worker(self):
+        agent = RemoteAgent('ok')
+        value = self.coordinator.run(agent)
+        self.assertTrue(value == 'OK' and agent.number == 100,
+                        f'Should get "OK" and updated agent state, got {value, agent.number}')
+
+    def test_should_raise_remote_failure(self):
+        self.assertRaises(RemoteAgentError, lambda: self.coordinator.run(RemoteAgent('fail')))
+
+    def test_should_redispatch_from_lost_worker(self):
+        coordinator = Coordinator([get_free_address(), self.worker.address], b'test',
+                                  logging_option=Logger.EmptyLogger)
+        value = coordinator.run(RemoteAgent('ok'))
+        self.assertTrue(value == 'OK', f'Should run agent on the live worker, got {value}')
+
+    def test_should_fail_when_all_workers_lost(self):
+        coordinator = Coordinator([get_free_address()], b'test', logging_option=Logger.EmptyLogger)
+        self.assertRaises(WorkerLostError, lambda: coordinator.run(RemoteAgent('ok')))
+
+    def test_should_run_pipeline_on_workers(self):
+        sf = Sinbadflow(Logger.EmptyLogger, dispatcher=self.coordinator)
+        pipeline = RemoteAgent('ok1') >> [RemoteAgent('fail'), RemoteAgent('ok2')] >> \
+            RemoteAgent('ok3', Trigger.FAIL_PREV)
+        sf.run(pipeline)
+        store = sf.status_handler.STATUS_STORE
+        self.assertTrue(store['OK'] == 3 and store['FAIL'] == 1 and sf.results.get('ok3') == 'OK3',
+                        f'Should run all agents remotely, got {store}')
+
+    def test_should_redispatch_from_hung_worker(self):
+        hung_worker = start_hung_worker(b'test')
+        coordinator = Coordinator([hung_worker.address, self.worker.address], b'test',
+                                  logging_option=Logger.EmptyLogger, heartbeat_timeout=0.3)
+        value = coordinator.run(RemoteAgent('ok'))
+        hung_worker.close()
+        self.assertTrue(value == 'OK', f'Should run agent on the live worker after heartbeat timeout, got {value}')
+
+    def test_should_keep_long_agent_alive_with_heartbeats(self):
+        worker = Worker(b'test', ('127.0.0.1', 0), heartbeat_seconds=0.05).start()
+        coordinator = Coordinator([worker.address], b'test', logging_option=Logger.EmptyLogger,
+                                  heartbeat_timeout=0.3)
+        value = coordinator.run(RemoteAgent('slow'))
+        worker.shutdown()
+        self.assertTrue(value == 'SLOW', f'Should finish agent running longer than heartbeat timeout, got {value}')
@@ -34,5 +34,6 @@ class ElementTest(unittest.TestCase):
         pipeline = [] >> Element('ok')
         self.assertTrue(pipeline.prev_elem.data == [] and pipeline.data[0].data == 'ok',
          f'Should get empty list, got {pipeline.prev_elem.data} and should get "ok", got {pipeline.data[0].data}')
-
-
+    def test_should_use_slots(self):
+        elem = Element('ok')
+        self.assertFalse(hasattr(elem, '__dict__'), 'Should not have __dict__')
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import Mock
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.plugins import EventStream, EventType
+from sinbadflow.utils import Logger, Status, Trigger
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        if 'fail' in self.data:
+            raise ValueError('fail')
+
+
+class EventStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sf = Sinbadflow(Logger.EmptyLogger)
+        self.pipeline = TestAgent('ok') >> [TestAgent('fail'), TestAgent('skip', Trigger.FAIL_ALL)]
+
+    def test_should_yield_run_events(self):
+        events = list(self.sf.iter_events(self.pipeline))
+        types = [event.type for event in events]
+        output = [EventType.PIPELINE_STARTED, EventType.STEP_STARTED, EventType.AGENT_STARTED,
+                  EventType.AGENT_FINISHED, EventType.STEP_FINISHED, EventType.STEP_STARTED,
+                  EventType.AGENT_SKIPPED, EventType.AGENT_STARTED, EventType.AGENT_FINISHED,
+                  EventType.STEP_FINISHED, EventType.PIPELINE_FINISHED]
+        self.assertTrue(types == output, f'Should get {output}, got {types}')
+        last_step = events[-2]
+        self.assertTrue(last_step.step == 1 and last_step.statuses == [Status.FAIL, Status.SKIPPED],
+                        f'Should get second step statuses, got {last_step}')
+
+    def test_should_remove_stream_after_run(self):
+        list(self.sf.iter_events(self.pipeline))
+        hooks = self.sf._Sinbadflow__hooks
+        self.assertTrue(all(not hooks[name] for name in hooks), f'Should remove all hooks, got {hooks}')
+
+    def test_should_raise_run_error_after_events(self):
+        self.sf.prewarmer = Mock()
+        self.sf.prewarmer.prewarm.side_effect = ZeroDivisionError
+        events = []
+
+        def consume():
+            for event in self.sf.iter_events(TestAgent('ok')):
+                events.append(event)
+        self.assertRaises(ZeroDivisionError, consume)
+        self.assertTrue(events[-1].type == EventType.PIPELINE_FINISHED, f'Should get all events, got {events}')
+
+    def test_should_call_event_callback(self):
+        finished = []
+
+        def on_event(event):
+            if event.type == EventType.AGENT_FINISHED:
+                finished.append((event.agent.data, event.status))
+        self.sf.register_plugin(EventStream(on_event))
+        self.sf.run(self.pipeline)
+        output = [('ok', Status.OK), ('fail', Status.FAIL)]
+        self.assertTrue(finished == output, f'Should get {output}, got {finished}')
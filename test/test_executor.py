@@ -208,3 +208,39 @@ class ExecutorTest(unittest.TestCase):
         output = {'ok1': 1, 'ok9': 1}
         self.assertTrue(self.run_store == output,
                         f"Should get {output}, got: {self.run_store}")
+
+    def test_should_prewarm_next_step_and_release_skipped(self):
+        prewarmer = mock.Mock()
+        self.sf.prewarmer = prewarmer
+        skipped = TestAgent('ok2', Trigger.FAIL_PREV)
+        pipeline = TestAgent('ok1') >> skipped
+        self.sf_run(pipeline)
+        prewarmed = [c[0][0] for c in prewarmer.prewarm.call_args_list]
+        self.assertTrue(prewarmed == [[skipped], []] and \
+                        mock.call([skipped], skipped=True) in prewarmer.release.call_args_list,
+                        f'Should prewarm and release skipped agent, got {prewarmer.mock_calls}')
+
+
+    def test_should_evaluate_shared_conditional_func_once_per_step(self):
+        calls = []
+
+        def condi():
+            calls.append(1)
+            return True
+
+        class DummyAgent(BaseAgent):
+            def run(self):
+                pass
+
+        pipeline = [DummyAgent('ok1'), DummyAgent('ok2'), DummyAgent('ok3')] >> DummyAgent('ok4')
+        pipeline = apply_conditional_func(pipeline, condi)
+        self.sf.run(pipeline)
+        self.assertTrue(len(calls) == 2 and self.sh.STATUS_STORE['OK'] == 4,
+                        f'Should evaluate conditional function once per step, got {len(calls)} calls')
+
+    def test_should_release_finished_steps(self):
+        self.sf.release_finished_steps = True
+        pipeline = TestAgent('ok1') >> TestAgent('ok2') >> TestAgent('ok3')
+        self.sf_run(pipeline)
+        self.assertTrue(self.run_store == {'ok1': 1, 'ok2': 1, 'ok3': 1} and pipeline.prev_elem is None,
+                        f'Should run all agents and unlink finished steps, got {self.run_store}')
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.agents.databricks import DatabricksAgent
+from sinbadflow.plugins import RunHistory
+from sinbadflow.plugins.history import get_cluster_workers
+from sinbadflow.utils import Logger, Trigger, set_run_details
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        set_run_details(self, run_id=42)
+        if 'fail' in self.data:
+            raise ValueError('fail')
+
+
+class RunHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = RunHistory(os.path.join(self.directory.name, 'history.db'), pipeline_name='daily')
+        self.sf = Sinbadflow(Logger.EmptyLogger, plugins=[self.history])
+
+    def tearDown(self):
+        self.history.close()
+        self.directory.cleanup()
+
+    def test_should_record_run_steps_and_agents(self):
+        self.sf.run(TestAgent('ok') >> [TestAgent('fail'), TestAgent('skip', Trigger.FAIL_ALL)])
+        connection = self.history.connection
+        runs = connection.execute('SELECT id, pipeline, ok, fail, skipped FROM runs').fetchall()
+        self.assertTrue(runs == [(self.history.last_run_id, 'daily', 1, 1, 1)], f'Should record the run, got {runs}')
+        steps = connection.execute('SELECT position, ok, fail, skipped FROM steps ORDER BY position').fetchall()
+        self.assertTrue(steps == [(0, 1, 0, 0), (1, 0, 1, 1)], f'Should record the steps, got {steps}')
+        agents = connection.execute('SELECT step, data, status, databricks_run_id FROM agent_runs ORDER BY data').fetchall()
+        output = [(1, 'fail', 'FAIL', 42), (0, 'ok', 'OK', 42), (1, 'skip', 'SKIPPED', None)]
+        self.assertTrue(agents == output, f'Should get {output}, got {agents}')
+
+    def test_should_record_submitted_runs_separately(self):
+        handles = [self.sf.submit(TestAgent(f'ok{i}') >> TestAgent(f'next{i}')) for i in range(2)]
+        for handle in handles:
+            handle.wait(5)
+        rows = self.history.connection.execute('''SELECT runs.ok, COUNT(DISTINCT agent_runs.step) FROM runs
+                                                  JOIN agent_runs ON agent_runs.run_id = runs.id GROUP BY runs.id''').fetchall()
+        self.assertTrue(rows == [(2, 2), (2, 2)], f'Should record two runs with two steps each, got {rows}')
+
+    def test_should_query_slowest_agents_and_failure_rates(self):
+        self.sf.run(TestAgent('ok') >> TestAgent('fail'))
+        self.sf.run(TestAgent('ok') >> TestAgent('ok2'))
+        self.history.connection.execute("UPDATE agent_runs SET duration = 10 WHERE data = 'ok2'")
+        slowest = self.history.slowest_agents(days=30, limit=1)
+        self.assertTrue(slowest[0][0] == 'ok2' and slowest[0][2] == 10, f'Should get ok2 as slowest, got {slowest}')
+        rates = self.history.failure_rates()
+        self.assertTrue(rates[0] == ('fail', 1, 1, 1.0), f'Should get fail agent first, got {rates}')
+        self.assertTrue(len(self.history.agent_durations('ok')) == 2, 'Should get durations of both ok runs')
+
+    def test_should_use_indexes(self):
+        plan = self.history.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT duration FROM agent_runs WHERE data = 'x' AND started_at >= 0").fetchall()
+        self.assertTrue('agent_runs_data' in str(plan), f'Should use data index, got {plan}')
+
+    def test_should_get_cluster_workers(self):
+        workers = [get_cluster_workers(DatabricksAgent('/a', cluster_mode='job', job_args={'num_workers': 4})),
+                   get_cluster_workers(DatabricksAgent('/a', cluster_mode='job',
+                                                       job_args={'autoscale': {'min_workers': 1, 'max_workers': 8}})),
+                   get_cluster_workers(DatabricksAgent('/a', cluster_mode='job', job_args={'existing_cluster_id': 'x'})),
+                   get_cluster_workers(DatabricksAgent('/a', cluster_mode='interactive')),
+                   get_cluster_workers(TestAgent('a'))]
+        self.assertTrue(workers == [4, 8, None, None, None], f'Should get [4, 8, None, None, None], got {workers}')
@@ -0,0 +1,69 @@
+import unittest
+import os
+import tempfile
+import urllib.request
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Logger, MetricsCollector, Status, Trigger, set_run_details
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        if 'fail' in self.data:
+            raise ValueError('fail')
+
+
+class MetricsCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.sf = Sinbadflow(Logger.EmptyLogger, metrics=self.metrics)
+
+    def test_should_count_statuses_per_agent_type(self):
+        pipeline = TestAgent('ok1') >> [TestAgent('fail'), TestAgent('ok2')] >> TestAgent('ok3', Trigger.OK_ALL)
+        self.sf.run(pipeline)
+        text = self.metrics.render()
+        expected = ['sinbadflow_agent_runs_total{agent_type="TestAgent",status="OK"} 2',
+                    'sinbadflow_agent_runs_total{agent_type="TestAgent",status="FAIL"} 1',
+                    'sinbadflow_agent_runs_total{agent_type="TestAgent",status="SKIPPED"} 1',
+                    'sinbadflow_agent_duration_seconds_count{agent_type="TestAgent"} 3',
+                    'sinbadflow_pipeline_runs_in_flight 0',
+                    'sinbadflow_workers 0']
+        missing = [line for line in expected if line not in text]
+        self.assertTrue(missing == [], f'Should render all metrics, missing {missing}')
+
+    def test_should_observe_queue_time(self):
+        agent = TestAgent('ok')
+        set_run_details(agent, queue_seconds=3)
+        self.metrics.agent_started(agent)
+        self.metrics.agent_finished(agent, Status.OK, 10)
+        text = self.metrics.render()
+        self.assertTrue('sinbadflow_queue_duration_seconds_bucket{agent_type="TestAgent",le="5"} 1' in text,
+                        f'Should observe queue time, got {text}')
+
+    def test_should_free_workers_after_step_error(self):
+        class BrokenMetrics(MetricsCollector):
+            def agent_started(self, agent):
+                raise RuntimeError('broken metrics')
+        metrics = BrokenMetrics()
+        sf = Sinbadflow(Logger.EmptyLogger, metrics=metrics)
+        self.assertRaises(RuntimeError, lambda: sf.run(TestAgent('ok1') >> [TestAgent('ok2'), TestAgent('ok3')]))
+        self.assertTrue(metrics.workers == 0, f'Should report step workers as free, got {metrics.workers}')
+
+    def test_should_write_metrics_file(self):
+        self.metrics.agent_skipped(TestAgent('ok'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sinbadflow.prom')
+            self.metrics.write_to_file(path)
+            with open(path) as f:
+                content = f.read()
+        self.assertTrue(content == self.metrics.render(), f'Should write rendered metrics, got {content}')
+
+    def test_should_serve_metrics(self):
+        server = self.metrics.serve(0, '127.0.0.1')
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            body = urllib.request.urlopen(url).read().decode('utf-8')
+        finally:
+            server.shutdown()
+        self.assertTrue(body == self.metrics.render(), f'Should serve rendered metrics, got {body}')
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import unittest
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.plugins import BasePlugin, CProfilePlugin, TracemallocPlugin
+from sinbadflow.utils import Logger, Status, Trigger
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        self.payload = [str(i) for i in range(1000)]
+
+
+class RecordingPlugin(BasePlugin):
+    def __init__(self):
+        self.calls = []
+
+    def before_step(self, elements):
+        self.calls.append(('before_step', [el.data for el in elements]))
+
+    def after_run(self, agent, status, duration):
+        self.calls.append(('after_run', agent.data, status))
+
+    def on_skip(self, agent):
+        self.calls.append(('on_skip', agent.data))
+
+    def after_step(self, elements, statuses):
+        self.calls.append(('after_step', statuses))
+
+
+class PluginTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sf = Sinbadflow(Logger.EmptyLogger)
+
+    def test_should_call_hooks_in_order(self):
+        plugin = RecordingPlugin()
+        self.sf.register_plugin(plugin)
+        self.sf.run(TestAgent('ok') >> TestAgent('skip', Trigger.FAIL_PREV))
+        output = [('before_step', ['ok']), ('after_run', 'ok', Status.OK), ('after_step', [Status.OK]),
+                  ('before_step', ['skip']), ('on_skip', 'skip'), ('after_step', [Status.SKIPPED])]
+        self.assertTrue(plugin.calls == output, f'Should get {output}, got {plugin.calls}')
+
+    def test_should_register_only_overridden_hooks(self):
+        self.sf.register_plugin(RecordingPlugin())
+        hooks = self.sf._Sinbadflow__hooks
+        registered = sorted(name for name in hooks if hooks[name])
+        output = ['after_run', 'after_step', 'before_step', 'on_skip']
+        self.assertTrue(registered == output, f'Should get {output}, got {registered}')
+
+    def test_should_add_hook_function(self):
+        started = []
+        self.sf.add_hook('before_run', lambda agent: started.append(agent.data))
+        self.sf.run([TestAgent('ok1'), TestAgent('ok2')])
+        self.assertTrue(sorted(started) == ['ok1', 'ok2'], f'Should call hook for both agents, got {started}')
+
+    def test_should_fail_on_unknown_hook(self):
+        self.assertRaises(ValueError, lambda: self.sf.add_hook('after_everything', print))
+
+    def test_should_profile_agents(self):
+        profiler = CProfilePlugin()
+        sf = Sinbadflow(Logger.EmptyLogger, plugins=[profiler])
+        sf.run(TestAgent('ok1') >> TestAgent('ok2'))
+        labels = [label for label, _ in profiler.results]
+        self.assertTrue(labels == ['TestAgent(ok1)', 'TestAgent(ok2)'], f'Should profile both agents, got {labels}')
+
+    def test_should_trace_agent_memory(self):
+        memory = TracemallocPlugin()
+        sf = Sinbadflow(Logger.EmptyLogger, plugins=[memory])
+        sf.run(TestAgent('ok1'))
+        label, differences = memory.results[0]
+        self.assertTrue(label == 'TestAgent(ok1)' and sum(d.size_diff for d in differences) > 0,
+                        f'Should record memory allocations, got {differences}')
+
+    def test_should_log_hook_errors_and_finish_run(self):
+        sf = Sinbadflow()
+        sf.add_hook('before_run', lambda agent: 1 / 0)
+        sf.add_hook('after_pipeline', lambda status_handler: 1 / 0)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sf.run(TestAgent('ok') >> TestAgent('next', Trigger.OK_PREV))
+        errors = [line for line in output.getvalue().splitlines() if 'ZeroDivisionError' in line]
+        self.assertTrue(sf.status_handler.STATUS_STORE['OK'] == 2 and len(errors) == 3,
+                        f'Should run all agents and log 3 hook errors, got {errors}')
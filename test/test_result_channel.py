@@ -0,0 +1,81 @@
+import unittest
+import array
+import pickle
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Logger, ResultChannel, SharedBuffer
+
+
+class ResultChannelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.channel = ResultChannel(shared_memory_threshold=1024)
+
+    def tearDown(self):
+        self.channel.clear()
+
+    def test_should_publish_and_get_value(self):
+        self.channel.publish('count', 42)
+        value = self.channel.get('count', expected_type=int)
+        self.assertTrue(value == 42 and self.channel.get('missing', 0) == 0,
+                        f'Should get 42 and default value, got {value}')
+
+    def test_should_fail_on_wrong_type(self):
+        self.channel.publish('count', 42)
+        self.assertRaises(TypeError, lambda: self.channel.get('count', expected_type=str))
+
+    def test_should_keep_small_buffer_in_memory(self):
+        self.channel.publish('small', b'small')
+        self.assertTrue(self.channel.get('small') == b'small' and self.channel.get_shared_buffer('small') is None,
+                        'Should keep small buffer as is')
+
+    def test_should_store_large_buffer_in_shared_memory(self):
+        values = array.array('d', range(1000))
+        self.channel.publish('array', values)
+        view = self.channel.get('array', expected_type=array.array)
+        handle = pickle.loads(pickle.dumps(self.channel.get_shared_buffer('array')))
+        remote_view = handle.open()
+        self.assertTrue(view.tolist() == values.tolist() and remote_view.tolist() == values.tolist(),
+                        'Should read the same values from shared memory')
+        remote_view.release()
+        view.release()
+        handle.release()
+
+    def test_should_not_share_non_contiguous_buffer(self):
+        view = memoryview(bytearray(4096))[::2]
+        self.assertTrue(SharedBuffer.create(view) is None, 'Should not share non contiguous buffer')
+
+
+class ResultPassingTest(unittest.TestCase):
+
+    def test_should_pass_results_downstream(self):
+        class ProducerAgent(BaseAgent):
+            def run(self):
+                return 10
+
+        class ConsumerAgent(BaseAgent):
+            def run(self):
+                return self.results.get('producer') * 2
+
+        sf = Sinbadflow(Logger.EmptyLogger)
+
+        def has_result():
+            return 'producer' in sf.results
+
+        def has_no_result():
+            return 'missing' in sf.results
+
+        pipeline = ProducerAgent('data', name='producer') >> [ConsumerAgent('consumer', conditional_func=has_result),
+                                                      ConsumerAgent('skipped', conditional_func=has_no_result)]
+        sf.run(pipeline)
+        keys = sorted(sf.results.keys())
+        self.assertTrue(sf.results.get('consumer') == 20 and keys == ['consumer', 'producer'],
+                        f'Should get consumer result 20, got {sf.results.get("consumer"), keys}')
+
+    def test_should_build_result_condition(self):
+        sf = Sinbadflow(Logger.EmptyLogger)
+        sf.results.publish('/check', 'ok')
+        is_ok = sf.results.condition('/check', lambda output: output == 'ok')
+        is_missing = sf.results.condition('/missing')
+        self.assertTrue(is_ok() and not is_missing() and is_ok.__name__ == 'result_condition[/check]',
+                        f'Should check published values, got {is_ok(), is_missing()}')
@@ -0,0 +1,160 @@
+import itertools
+import threading
+import unittest
+from unittest.mock import Mock
+from concurrent.futures import TimeoutError
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.run_handle import count_steps
+from sinbadflow.selector import Selector
+from sinbadflow.plugins import EventStream, EventType, TracemallocPlugin
+from sinbadflow.utils import Logger, Trigger, get_run_details, set_run_details
+
+
+class BlockingAgent(BaseAgent):
+    def __init__(self, data, event, trigger=Trigger.DEFAULT):
+        super().__init__(data, trigger)
+        self.event = event
+
+    def run(self):
+        self.event.wait(5)
+        return self.data
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        if 'fail' in self.data:
+            raise ValueError('fail')
+        return self.data
+
+
+class CountAgent(BaseAgent):
+    def run(self):
+        return 5
+
+
+class SharedReaderAgent(BaseAgent):
+    def __init__(self, data, barrier):
+        super().__init__(data)
+        self.barrier = barrier
+
+    def run(self):
+        # Both runs start the agent before any of them reads its results
+        self.barrier.wait()
+        count = self.results.get('count')
+        set_run_details(self, run_id=count)
+        return count
+
+
+class RunHandleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sf = Sinbadflow(Logger.EmptyLogger)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_should_count_steps(self):
+        pipeline = TestAgent('a') >> [TestAgent('b'), TestAgent('c')] >> TestAgent(None)
+        counts = [count_steps(pipeline), count_steps(TestAgent('a')), count_steps([TestAgent('a')]), count_steps(None)]
+        self.assertTrue(counts == [2, 1, 1, 0], f'Should get [2, 1, 1, 0], got {counts}')
+
+    def test_should_return_handle_before_run_finishes(self):
+        handle = self.sf.submit(BlockingAgent('blocked', self.release) >> TestAgent('next'))
+        self.assertFalse(handle.wait(0.05), 'Should not finish before the agent is released')
+        progress = handle.progress()
+        self.assertTrue(progress.state == 'RUNNING' and progress.running_agents == ['blocked'] and progress.total_steps == 2,
+                        f'Should be running blocked agent, got {progress}')
+        self.release.set()
+        results = handle.result(5)
+        progress = handle.progress()
+        self.assertTrue(progress.state == 'FINISHED' and progress.finished_steps == 2 and progress.statuses['OK'] == 2,
+                        f'Should finish both steps, got {progress}')
+        self.assertTrue(results.get('next') == 'next', f'Should get agent result, got {results.keys()}')
+
+    def test_should_run_submissions_independently(self):
+        first = self.sf.submit(TestAgent('fail') >> TestAgent('ok', Trigger.OK_PREV))
+        second = self.sf.submit(TestAgent('ok') >> TestAgent('ok2', Trigger.OK_PREV))
+        first.wait(5)
+        second.wait(5)
+        statuses = (first.status_handler.STATUS_STORE['SKIPPED'], second.status_handler.STATUS_STORE['OK'])
+        self.assertTrue(statuses == (1, 2), f'Should keep statuses separated, got {statuses}')
+        self.assertTrue(self.sf.status_handler.STATUS_STORE['OK'] == 0, 'Should not change the statuses of the runner')
+
+    def test_should_cancel_remaining_steps(self):
+        handle = self.sf.submit(BlockingAgent('blocked', self.release) >> TestAgent('next'))
+        handle.wait(0.05)
+        self.assertTrue(handle.cancel(), 'Should cancel running pipeline')
+        self.assertTrue(handle.progress().state == 'CANCELLING', f'Should be cancelling, got {handle.progress()}')
+        self.release.set()
+        handle.wait(5)
+        progress = handle.progress()
+        self.assertTrue(progress.state == 'CANCELLED' and progress.finished_steps == 1,
+                        f'Should not start second step, got {progress}')
+        self.assertFalse(handle.cancel(), 'Should not cancel finished run')
+
+    def test_should_cancel_pending_run(self):
+        sf = Sinbadflow(Logger.EmptyLogger, max_background_runs=1)
+        running = sf.submit(BlockingAgent('blocked', self.release))
+        pending = sf.submit(TestAgent('a'))
+        self.assertTrue(pending.progress().state == 'PENDING', f'Should wait for the free worker, got {pending.progress()}')
+        self.assertTrue(pending.cancel() and pending.progress().state == 'CANCELLED', 'Should cancel pending run')
+        self.release.set()
+        self.assertTrue(running.wait(5), 'Should finish the running pipeline')
+
+    def test_should_raise_timeout_and_run_errors(self):
+        handle = self.sf.submit(BlockingAgent('blocked', self.release))
+        self.assertRaises(TimeoutError, handle.result, 0.01)
+        self.release.set()
+        handle.wait(5)
+        self.sf.prewarmer = Mock()
+        self.sf.prewarmer.prewarm.side_effect = ZeroDivisionError
+        handle = self.sf.submit(TestAgent('a'))
+        self.assertRaises(ZeroDivisionError, handle.result, 5)
+        self.assertTrue(handle.progress().state == 'FAILED', f'Should fail, got {handle.progress()}')
+
+    def test_should_submit_selected_slice(self):
+        pipeline = TestAgent('a') >> TestAgent('b') >> TestAgent('c')
+        handle = self.sf.submit(pipeline, Selector(steps=slice(1, None)))
+        handle.wait(5)
+        progress = handle.progress()
+        self.assertTrue(progress.total_steps == 2 and progress.statuses['OK'] == 2, f'Should run 2 steps, got {progress}')
+
+    def test_should_pass_run_results_to_conditions(self):
+        pipeline = CountAgent('count') >> [
+            TestAgent('channel', conditional_func=self.sf.results.condition('count', lambda value: value == 5)),
+            TestAgent('lambda', conditional_func=lambda: self.sf.results.get('count', 0) == 5)]
+        handle = self.sf.submit(pipeline)
+        handle.wait(5)
+        statuses = handle.progress().statuses
+        self.assertTrue(statuses['OK'] == 3 and statuses['SKIPPED'] == 0,
+                        f'Should run conditional agents with results of the submitted run, got {statuses}')
+        self.assertTrue(self.sf.results.get('count') is None and handle.results.get('count') == 5,
+                        'Should keep submitted run results out of the runner results')
+
+    def test_should_copy_stateful_plugins_for_every_run(self):
+        steps = []
+        self.sf.register_plugin(EventStream(lambda event: steps.append(event.step)
+                                            if event.type == EventType.STEP_STARTED else None))
+        handles = [self.sf.submit(TestAgent('a') >> TestAgent('b')) for _ in range(2)]
+        for handle in handles:
+            handle.wait(5)
+        self.assertTrue(sorted(steps) == [0, 0, 1, 1], f'Should count steps of every run separately, got {steps}')
+
+    def test_should_reject_plugins_unsafe_for_concurrent_runs(self):
+        self.sf.register_plugin(TracemallocPlugin())
+        self.assertRaises(RuntimeError, lambda: self.sf.submit(TestAgent('a')))
+
+    def test_should_keep_run_state_of_shared_agents(self):
+        counter = itertools.count(1)
+        source = TestAgent('count')
+        source.run = lambda: next(counter)
+        pipeline = source >> SharedReaderAgent('reader', threading.Barrier(2, timeout=5))
+        run_ids = []
+        self.sf.add_hook('after_run', lambda agent, status, duration: run_ids.append(get_run_details(agent).get('run_id')))
+        handles = [self.sf.submit(pipeline) for _ in range(2)]
+        values = [(handle.result(5).get('count'), handle.results.get('reader')) for handle in handles]
+        recorded = sorted(run_id for run_id in run_ids if run_id is not None)
+        self.assertTrue(all(count == reader for count, reader in values) and recorded == [1, 2],
+                        f'Should read results and record run details of own run, got {values, run_ids}')
@@ -0,0 +1,68 @@
+import unittest
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.selector import Selector
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Logger, Trigger
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        pass
+
+
+class ReportAgent(TestAgent):
+    pass
+
+
+class SelectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = TestAgent('/ingest/a') >> [TestAgent('/ingest/b'), TestAgent('/clean', tags=['core'])] >> \
+            ReportAgent('/reports/daily', Trigger.OK_PREV, tags=['reporting']) >> \
+            ReportAgent('/reports/summary', Trigger.OK_ALL, tags=['reporting']) >> TestAgent()
+
+    def get_selected(self, selector):
+        pipeline = selector.select(self.pipeline)
+        steps = []
+        while pipeline is not None:
+            steps.insert(0, [agent.data for agent in pipeline.data])
+            pipeline = pipeline.prev_elem
+        return steps
+
+    def test_should_select_by_tag(self):
+        steps = self.get_selected(Selector(tags=['reporting']))
+        output = [['/reports/daily'], ['/reports/summary']]
+        self.assertTrue(steps == output, f'Should get {output}, got {steps}')
+
+    def test_should_select_by_type_and_glob(self):
+        steps = self.get_selected(Selector(agent_type='ReportAgent', path_glob='*summary'))
+        output = [['/reports/summary']]
+        self.assertTrue(steps == output, f'Should get {output}, got {steps}')
+
+    def test_should_select_step_range(self):
+        steps = self.get_selected(Selector(steps=slice(1, None)))
+        output = [['/ingest/b', '/clean'], ['/reports/daily'], ['/reports/summary']]
+        self.assertTrue(steps == output, f'Should get {output}, got {steps}')
+
+    def test_should_select_previous_step_upstream(self):
+        steps = self.get_selected(Selector(path_glob='/reports/daily', with_upstream=True))
+        output = [['/ingest/b', '/clean'], ['/reports/daily']]
+        self.assertTrue(steps == output, f'Should get {output}, got {steps}')
+
+    def test_should_select_all_upstream(self):
+        steps = self.get_selected(Selector(path_glob='/reports/summary', with_upstream=True))
+        output = [['/ingest/a'], ['/ingest/b', '/clean'], ['/reports/daily'], ['/reports/summary']]
+        self.assertTrue(steps == output, f'Should get {output}, got {steps}')
+
+    def test_should_run_selected_agents_only(self):
+        sf = Sinbadflow(Logger.EmptyLogger)
+        sf.run(self.pipeline, selector=Selector(tags=['core']))
+        store = sf.status_handler.STATUS_STORE
+        self.assertTrue(store['OK'] == 1 and store['SKIPPED'] == 0,
+                        f'Should run only one agent, got {store}')
+
+    def test_should_not_change_input_pipeline(self):
+        Selector(tags=['reporting']).select(self.pipeline)
+        steps = Selector().select(self.pipeline)
+        self.assertTrue(self.pipeline.prev_elem.data[0].data == '/reports/summary' and steps is not self.pipeline,
+                        'Should keep input pipeline links')
@@ -0,0 +1,70 @@
+import unittest
+import time
+from sinbadflow.simulator import PipelineSimulator
+from sinbadflow.builder import PipelineBuilder
+from sinbadflow.selector import Selector
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.utils import Trigger
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        pass
+
+
+class JobAgent(TestAgent):
+    def __init__(self, data, num_workers):
+        self.cluster_mode = 'job'
+        self.job_args = {'num_workers': num_workers}
+        super(JobAgent, self).__init__(data)
+
+
+class PipelineSimulatorTest(unittest.TestCase):
+
+    def test_should_compute_makespan_with_worker_limit(self):
+        pipeline = TestAgent('a') >> [TestAgent('b'), TestAgent('c'), TestAgent('d')]
+        simulator = PipelineSimulator(pipeline, {'a': 10, 'b': 30, 'c': 20, 'd': 5}, max_workers=2)
+        result = simulator.simulate_once()
+        utilisation = (10 + 55) / (10 * 1 + 30 * 2)
+        self.assertTrue(result.makespan == 40 and abs(result.worker_utilisation - utilisation) < 1e-9,
+                        f'Should get makespan 40 and utilisation {utilisation}, got {result}')
+
+    def test_should_replay_trigger_semantics(self):
+        pipeline = TestAgent('fail') >> [TestAgent('ok', Trigger.OK_PREV), TestAgent('handle', Trigger.FAIL_PREV)]
+        simulator = PipelineSimulator(pipeline, failure_probabilities={'fail': 1.0}, default_duration=10)
+        result = simulator.simulate_once()
+        self.assertTrue(result.makespan == 20 and result.statuses == {'OK': 1, 'FAIL': 1, 'SKIPPED': 1},
+                        f'Should skip OK_PREV agent, got {result}')
+
+    def test_should_count_job_cluster_seconds(self):
+        pipeline = JobAgent('job', 3) >> TestAgent('local')
+        result = PipelineSimulator(pipeline, default_duration=100).simulate_once()
+        self.assertTrue(result.cluster_seconds == 400, f'Should get 400 cluster-seconds, got {result.cluster_seconds}')
+
+    def test_should_simulate_single_step_pipeline(self):
+        durations = {'a': 10, 'b': 20}
+        direct = PipelineSimulator([JobAgent('a', 3), JobAgent('b', 3)], durations).simulate_once()
+        built = PipelineSimulator(PipelineBuilder([[JobAgent('a', 3), JobAgent('b', 3)]]).build(), durations).simulate_once()
+        selected = PipelineSimulator(Selector(path_glob='a').select(JobAgent('a', 3) >> JobAgent('b', 3)),
+                                     durations).simulate_once()
+        self.assertTrue(built == direct and direct.makespan == 20 and direct.cluster_seconds == 120,
+                        f'Should simulate built step like the agent list, got {built, direct}')
+        self.assertTrue(selected.makespan == 10 and selected.statuses['OK'] == 1,
+                        f'Should simulate selected step, got {selected}')
+
+    def test_should_sample_durations(self):
+        pipeline = TestAgent('a') >> TestAgent('b')
+        simulator = PipelineSimulator(pipeline, default_duration=lambda rng: rng.uniform(10, 20), seed=1)
+        summary = simulator.simulate(2000)
+        self.assertTrue(29 < summary.mean_makespan < 31 and summary.p50_makespan <= summary.p95_makespan,
+                        f'Should get mean makespan close to 30, got {summary}')
+
+    def test_should_simulate_thousands_runs_per_second(self):
+        pipeline = TestAgent('start')
+        for i in range(10):
+            pipeline = pipeline >> [TestAgent(f'agent_{i}_{j}') for j in range(5)]
+        simulator = PipelineSimulator(pipeline, default_failure_probability=0.1, max_workers=2, seed=1)
+        start = time.time()
+        simulator.simulate(1000)
+        elapsed = time.time() - start
+        self.assertTrue(elapsed < 1, f'Should simulate 1000 runs in less than a second, took {elapsed}')
@@ -1,6 +1,7 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from sinbadflow.executor import Sinbadflow
-from sinbadflow.utils import StatusHandler, Status, Trigger
+from sinbadflow.utils import Logger, StatusHandler, Status, Trigger
 
 
 class StatusHandlerTest(unittest.TestCase):
@@ -55,3 +56,37 @@ class StatusHandlerTest(unittest.TestCase):
                     not is_fail_mapped_to_ok and
                     not is_ok_mapped_to_fail and
                     is_fail_mapped_to_fail)
+
+    def test_should_not_change_store_on_print(self):
+        self.sh.add_status([Status.OK, Status.SKIPPED])
+        self.sh.print_results(Logger(Logger.EmptyLogger))
+        self.sh.print_results(Logger(Logger.EmptyLogger))
+        is_mapped = self.sh.is_status_mapped_to_trigger(Trigger.OK_ALL)
+        self.assertTrue(self.sh.STATUS_STORE == {'OK': 1, 'FAIL': 0, 'SKIPPED': 1} and is_mapped,
+                        f'Should keep the store unchanged, got {self.sh.STATUS_STORE}')
+
+    def test_should_record_step_statuses_as_agents_finish(self):
+        self.sh.open_step(3)
+        self.sh.record(2, Status.FAIL)
+        counts = (self.sh.get_counts(include_open_step=True), self.sh.get_counts())
+        output = ({'OK': 0, 'FAIL': 1, 'SKIPPED': 0}, {'OK': 0, 'FAIL': 0, 'SKIPPED': 0})
+        self.assertTrue(counts == output, f'Should count the open step only on request, got {counts}')
+        self.sh.record(0, Status.OK)
+        statuses = self.sh.close_step()
+        self.assertTrue(statuses == [Status.OK, Status.SKIPPED, Status.FAIL] and self.sh.steps == [statuses]
+                        and self.sh.last_status == Status.FAIL, f'Should close the step, got {statuses}')
+
+    def test_should_record_concurrently(self):
+        self.sh.open_step(1000)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: self.sh.record(i, Status.OK if i % 2 else Status.FAIL), range(1000)))
+        self.sh.close_step()
+        self.assertTrue(self.sh.STATUS_STORE == {'OK': 500, 'FAIL': 500, 'SKIPPED': 0},
+                        f'Should record all statuses, got {self.sh.STATUS_STORE}')
+
+    def test_should_keep_last_status_on_skipped_or_empty_step(self):
+        self.sh.add_status([Status.FAIL])
+        self.sh.add_status([Status.SKIPPED])
+        self.sh.add_status([])
+        self.assertTrue(self.sh.last_status == Status.FAIL and len(self.sh.steps) == 3,
+                        f'Should keep FAIL last status, got {self.sh.last_status}')
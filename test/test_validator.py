@@ -0,0 +1,103 @@
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from sinbadflow.executor import Sinbadflow
+from sinbadflow.agents.base_agent import BaseAgent
+from sinbadflow.agents.databricks import DatabricksAgent
+from sinbadflow.utils import Logger, Trigger
+from sinbadflow.utils.dbr_job import JobSubmitter, Workspace, WorkspacePool, WrongModeSelected
+from sinbadflow.validator import PipelineValidator, PipelineValidationError, WorkspacePathChecker
+
+
+class TestAgent(BaseAgent):
+    def run(self):
+        pass
+
+
+class PipelineValidatorTest(unittest.TestCase):
+
+    def test_should_pass_valid_pipeline(self):
+        pipeline = DatabricksAgent('/a', cluster_mode='job', job_args={'num_workers': 2}, args={'date': '2020-01-01'}) >> \
+            [DatabricksAgent('/b', Trigger.FAIL_PREV, cluster_id='c1'), TestAgent('c')]
+        problems = PipelineValidator(lambda path: True).validate(pipeline)
+        self.assertTrue(problems == [], f'Should find no problems, got {problems}')
+
+    def test_should_report_all_problems(self):
+        pipeline = DatabricksAgent('/a', Trigger.FAIL_PREV, cluster_mode='jobs', timeout=0) >> \
+            DatabricksAgent('/b', cluster_mode='job', job_args={'num_worker': 2, 'num_workers': 1, 'autoscale': {}},
+                            args={'limit': 10}) >> \
+            DatabricksAgent('/c', job_args={'num_workers': 2}) >> \
+            DatabricksAgent('/d', cluster_id='c1', job_args={'num_workers': 2})
+        problems = PipelineValidator(lambda path: path != '/c').validate(pipeline)
+        output = ['Step 0, agent DatabricksAgent(/a): trigger FAIL_PREV in the first step never runs',
+                  'Step 0, agent DatabricksAgent(/a): cluster_mode "jobs" is not supported (interactive/job)',
+                  'Step 0, agent DatabricksAgent(/a): timeout 0 is not a positive integer',
+                  "Step 1, agent DatabricksAgent(/b): unknown job_args keys ['num_worker']",
+                  'Step 1, agent DatabricksAgent(/b): job_args set both num_workers and autoscale',
+                  "Step 1, agent DatabricksAgent(/b): args ['limit'] are not strings (notebook widgets take string values)",
+                  'Step 2, agent DatabricksAgent(/c): job_args are ignored in interactive mode without cluster_id',
+                  "Step 3, agent DatabricksAgent(/d): job_args ['num_workers'] are ignored with existing_cluster_id",
+                  'Notebook /c: not found']
+        self.assertTrue(problems == output, f'Should get {output}, got {problems}')
+
+    def test_should_pass_fail_all_in_first_step(self):
+        agent = TestAgent('a', Trigger.FAIL_ALL)
+        agent.run = Mock()
+        sf = Sinbadflow(Logger.EmptyLogger, validator=PipelineValidator())
+        sf.run(agent >> TestAgent('b'))
+        self.assertTrue(agent.run.called, 'Should run FAIL_ALL agent of the first step (no previous runs failed)')
+
+    def test_should_check_paths_concurrently(self):
+        barrier = threading.Barrier(3, timeout=1)
+
+        def checker(path):
+            barrier.wait()
+            return True
+        pipeline = [DatabricksAgent('/a'), DatabricksAgent('/b'), DatabricksAgent('/c')]
+        problems = PipelineValidator(checker).validate(pipeline)
+        self.assertTrue(problems == [], f'Should check all paths at the same time, got {problems}')
+
+    def test_should_report_failed_path_check(self):
+        def checker(path):
+            raise ConnectionError('no network')
+        problems = PipelineValidator(checker).validate(DatabricksAgent('/a'))
+        output = ['Notebook /a: check failed (ConnectionError: no network)']
+        self.assertTrue(problems == output, f'Should get {output}, got {problems}')
+
+    def test_should_stop_run_before_first_step(self):
+        agent = TestAgent('a', Trigger.FAIL_ALL)
+        agent.run = Mock()
+        sf = Sinbadflow(Logger.EmptyLogger, validator=PipelineValidator())
+        with self.assertRaises(PipelineValidationError) as context:
+            sf.run(TestAgent('b') >> agent >> TestAgent('c', 'ok'))
+        self.assertTrue(len(context.exception.problems) == 1 and not agent.run.called,
+                        f'Should not run any agent, got {context.exception.problems}')
+
+    def test_should_check_notebook_in_workspace(self):
+        responses = {'/a': (200, {'object_type': 'NOTEBOOK'}), '/b': (200, {'object_type': 'DIRECTORY'}),
+                     '/c': (404, {'error_code': 'RESOURCE_DOES_NOT_EXIST'})}
+
+        def mock_call_api(method, endpoint, payload=None):
+            status_code, body = responses[payload['path']]
+            return Mock(status_code=status_code, json=Mock(return_value=body))
+        with patch.object(JobSubmitter, 'call_api', side_effect=mock_call_api):
+            checker = WorkspacePathChecker()
+            found = [checker(path) for path in ['/a', '/b', '/c']]
+        self.assertTrue(found == [True, False, False], f'Should find notebook /a only, got {found}')
+
+    def test_should_check_notebook_in_every_pool_workspace(self):
+        notebooks = {'https://adb-1': {'/a', '/b'}, 'https://adb-2': {'/b'}}
+        workspaces = [Workspace('https://adb-1', 't1'), Workspace('https://adb-2', 't2')]
+        for workspace in workspaces:
+            workspace.call_api = Mock(side_effect=lambda method, endpoint, payload=None, paths=notebooks[workspace.instance]:
+                                      Mock(status_code=200 if payload['path'] in paths else 404,
+                                           json=Mock(return_value={'object_type': 'NOTEBOOK'})))
+        JobSubmitter.set_workspace_pool(WorkspacePool(workspaces))
+        self.addCleanup(JobSubmitter.set_workspace_pool, None)
+        with patch.object(JobSubmitter, 'call_api', side_effect=AssertionError('default instance should not be called')):
+            checker = WorkspacePathChecker()
+            found = [checker(path) for path in ['/a', '/b']]
+        self.assertTrue(found == [False, True], f'Should find notebook /b in both workspaces only, got {found}')
+
+    def test_should_raise_wrong_mode_error(self):
+        self.assertRaises(WrongModeSelected, JobSubmitter, 'jobs', {})